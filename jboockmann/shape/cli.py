@@ -3,7 +3,7 @@ import json
 import os
 import tempfile
 
-from . import composition, constants, helper, learn, match, verifast
+from . import composition, constants, estimate, helper, learn, match, pruning, verifast
 from .helper import logger
 from .model import MemoryGraph
 
@@ -13,20 +13,97 @@ from typing import Optional
 class FireCLI(object):
 
     @staticmethod
-    def learn(*memory_graph_paths: str):
+    def learn(*memory_graph_paths: str, model=None, output=None, statistics=None):
         """
         Infers a shape predicate matching a list of input memory graphs.
 
         :param memory_graph_paths: A non-empty list of paths containing memory graphs.
+        :param model: The path to a rule ordering model, see `train_ordering`.
+        :param output: The path to which the learned rules are written.
+        :param statistics: The path to which the pruning statistics of each complexity level of each attempt, see `learn.learn`, are written.
         :return: None
         """
         memory_graphs = list(
             map(lambda p: MemoryGraph.fromFile(p), memory_graph_paths))
-        rules = learn.learn(memory_graphs)
+        if model is not None:
+            with open(model, 'r') as f:
+                model = pruning.validateOrderingModel(json.load(f))
+        levels = None if statistics is None else []
+        try:
+            rules = learn.learn(memory_graphs, model=model, statistics=levels)
+        finally:
+            if statistics is not None:
+                with open(statistics, 'w') as f:
+                    f.write(json.dumps(levels, indent=4))
+                    f.flush()
 
         logger().info("The learned rules are:")
         for rule in rules:
             logger().info(rule)
+        FireCLI._write_rules(rules, output)
+
+    @staticmethod
+    def train_ordering(*predicate_paths: str, output='ordering-model.json'):
+        """
+        Trains a rule ordering model from shape predicates, e.g., the rules
+        templates or the rules written by `learn` and `match`.
+
+        :param predicate_paths: A non-empty list of paths containing shape predicates.
+        :param output: The path to which the model is written.
+        :return: None
+        """
+        predicates = [helper.parseRulesTemplate(p) for p in predicate_paths]
+        model = pruning.trainOrderingModel(predicates)
+        logger().info(
+            f'Writing rule ordering model trained from {len(predicates)} '
+            f'predicates to "{output}"'
+        )
+        with open(output, 'w') as f:
+            f.write(json.dumps(model, indent=4))
+            f.flush()
+
+    @staticmethod
+    def _write_rules(rules, output):
+        if output is None:
+            return
+        with open(output, 'w') as f:
+            f.write('\n'.join(rules) + '\n')
+            f.flush()
+
+    @staticmethod
+    def dry_run(*memory_graph_paths: str, prune: bool = True, prune_limit: int = None):
+        """
+        Estimates the size of each complexity level of `learn` for a list of
+        input memory graphs without conducting the search.
+
+        :param memory_graph_paths: A non-empty list of paths containing memory graphs.
+        :param prune: Whether to count the candidate rules after pruning.
+        :param prune_limit: The maximal number of candidate rules to be pruned, see `estimate.estimate`.
+        :return: None
+        """
+        memory_graphs = list(
+            map(lambda p: MemoryGraph.fromFile(p), memory_graph_paths))
+        levels = estimate.estimate(
+            memory_graphs, prune=prune, prune_limit=prune_limit
+        )
+
+        logger().info(
+            "attempt    p_arity p_calls entry_calls candidates  pruned cost"
+        )
+        for level in levels:
+            pruned = level['pruned']
+            if level['skipped']:
+                pruned = 'skipped'
+            elif pruned is None:
+                pruned = '-'
+            # the cost of a level that was not pruned is an upper bound
+            cost = level['cost'] if level['exact'] else f"<={level['cost']}"
+            logger().info(
+                "{attempt:10} {p_arity:7} {p_calls:7} {entry_calls:11} "
+                "{candidates:10} {pruned!s:>7} {cost}".format(**dict(
+                    level, pruned=pruned, cost=cost
+                ))
+            )
 
     @staticmethod
     def composition(*memory_graph_paths: str):
@@ -39,13 +116,14 @@ class FireCLI(object):
             logger().info(rule)
 
     @staticmethod
-    def match(*memory_graph_paths: str, template_path=None) -> None:
+    def match(*memory_graph_paths: str, template_path=None, output=None) -> None:
         """
         Check whether any or a predefined shape template match with respect to
         an input list of memory graphs.
 
         :param memory_graph_paths: A non-empty list of paths containing memory graphs.
         :param template_path:
+        :param output: The path to which the matching rules are written.
         :return: None
         """
         memory_graphs = list(
@@ -60,21 +138,28 @@ class FireCLI(object):
         logger().info("The learned rules are:")
         for rule in rules:
             logger().info(rule)
+        FireCLI._write_rules(rules, output)
 
     @staticmethod
-    def convert(memory_graph: str):
+    def convert(memory_graph: str, binary: bool = False):
         """
-        Converts a memory graph from .pl or .dot format to .json format.
+        Converts a memory graph from .pl, .dot or .mgb format to .json format,
+        or to the binary .mgb format if `binary` is set, which is loaded
+        without parsing.
 
         :param memory_graph: The path to the memory graph.
+        :param binary: Whether to write the binary .mgb format.
         :return: None
         """
         name, _ = os.path.splitext(memory_graph)
-        output_file = f'{name}.json'
+        output_file = f'{name}.mgb' if binary else f'{name}.json'
         logger().info(
             f'Translating MemoryGraph from "{memory_graph}" to "{output_file}"'
         )
         memory_graph = MemoryGraph.fromFile(memory_graph)
+        if binary:
+            memory_graph.compact().toBinaryFile(output_file)
+            return
         with open(output_file, 'w') as f:
             f.write(json.dumps(memory_graph.json, indent=4))
             f.flush()
@@ -27,17 +27,7 @@ def divideanconquer(memory_graph: MemoryGraph) -> List[str]:
     entrypoints = memory_graph.json["entrypoints"]
     ep2nodes = {}
     for ep in entrypoints:
-        nodes = []
-        stack = [ep["target"]]
-        while stack:
-            top = stack.pop()
-            node = [n for n in memory_graph.json["vertices"]
-                    if n["id"] == top][0]
-            stack.extend(
-                [a["value"] for a in node["assignment"] if a["value"] != "NULL"]
-            )
-            nodes.append(top)
-        ep2nodes[ep["target"]] = nodes
+        ep2nodes[ep["target"]] = set(memory_graph.reachableNodes(ep["target"]))
 
     shared_nodes = set.intersection(
         *[set(nodes) for nodes in ep2nodes.values()]
@@ -92,7 +82,7 @@ def extract_subgraph(memory_graph: MemoryGraph, ep: str) -> MemoryGraph:
     sets the new entrypointer to ep.
     """
     # patch vertices
-    rnodes = memory_graph.reachableNodes(ep)
+    rnodes = set(memory_graph.reachableNodes(ep))
     memory_graph.json["vertices"] = [
         v for v in memory_graph.vertices() if v["id"] in rnodes
     ]
@@ -106,7 +96,7 @@ def extract_subgraph(memory_graph: MemoryGraph, ep: str) -> MemoryGraph:
     ]
 
     # patch entrypoints
-    ep_node = [v for v in memory_graph.vertices() if v["id"] == ep][0]
+    ep_node = memory_graph.vertex(ep)
     memory_graph.json["entrypoints"] = [
         {
             'name': 'ep0',
@@ -170,13 +160,14 @@ def resolve_nesting(memory_graph: MemoryGraph) -> List[str]:
     ]
 
     entries = []
+    parent_ids = set(v["id"] for v in parent.vertices())
     # traverse each vertex of the parent memory graph
     for v in parent.vertices():
         # add each node pointed to by the vertex if not in the parent's vertices list
         for a in v["assignment"]:
             if a["value"] == "NULL":
                 continue
-            if a["value"] in [v["id"] for v in parent.vertices()]:
+            if a["value"] in parent_ids:
                 continue
             entries.append((a["name"], a["value"]))
 
@@ -191,6 +182,7 @@ def resolve_nesting(memory_graph: MemoryGraph) -> List[str]:
         vertex["assignment"] = [
             a for a in vertex["assignment"] if a["type"] == ep_type
         ]
+    parent.invalidateIndex()
 
     # map fields to entry nodes
     field2entrynodes = {}
@@ -280,6 +272,8 @@ def synth_master_shape(memory_graphs: List[MemoryGraph]) -> List[str]:
 
 
 def composition(memory_graphs: List[MemoryGraph]) -> List[str]:
+    # the memory graphs are patched, which compact memory graphs do not support
+    memory_graphs = [m.toMemoryGraph() for m in memory_graphs]
 
     if len(memory_graphs) > 1:
         try:
@@ -380,7 +374,7 @@ def partition_memory_graphs(memory_graphs, partition):
                 rnodes.extend(
                     memory_graph_.reachableNodes(ep_node)
                 )
-            rnodes = list(set(rnodes))
+            rnodes = set(rnodes)
             memory_graph_.json["vertices"] = [
                 v for v in memory_graph_.vertices()
                 if v["id"] in rnodes
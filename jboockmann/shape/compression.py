@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Provides means to compress memory graphs before the search by shortening long
+homogeneous chains of nodes, e.g., the inner nodes of a long list, such that
+the MI has to consume fewer nodes. The compression preserves the vertex
+abstractions of the memory graph, but not necessarily whether it matches a
+shape predicate, e.g., a predicate of lists of even length. Hence, a shape
+predicate learned for compressed memory graphs is confirmed on the original
+memory graphs, see `learn.learn`.
+"""
+
+import copy
+from typing import Dict, List
+
+from . import constants
+from .helper import logger
+from .model import MemoryGraph
+
+
+def compress(memory_graph: MemoryGraph, length: int = None) -> MemoryGraph:
+    """
+    Compresses a memory graph by shortening each chain of nodes along a field,
+    in the order of the fields, see function `compressChains`. The original
+    memory graph is returned if no chain is shortened or if the compression
+    does not preserve the vertex abstractions of the entry nodes and of the
+    other nodes.
+
+    :param memory_graph: A homogeneously typed memory graph.
+    :param length: The number of nodes kept of each chain, which defaults to `constants.COMPRESSION_RUN_LENGTH`.
+    :return: The compressed memory graph or the original one.
+    """
+    if length is None:
+        length = constants.COMPRESSION_RUN_LENGTH
+    if length is None or len(memory_graph.structs()) != 1:
+        return memory_graph
+
+    data = copy.deepcopy(memory_graph.json)
+    removed = 0
+    for field in memory_graph.fields():
+        removed += compressChains(
+            data['vertices'], data['entrypoints'], field, length
+        )
+    if not removed:
+        return memory_graph
+
+    compressed = MemoryGraph.fromJSON(data)
+    if abstractions(compressed) != abstractions(memory_graph):
+        logger().debug(
+            'dropping the compression, it does not preserve the abstractions')
+        return memory_graph
+    logger().debug(f'compression removed {removed} nodes')
+    return compressed
+
+
+def abstractions(memory_graph: MemoryGraph) -> tuple:
+    """
+    Returns the vertex abstractions of the entry nodes and the distinct vertex
+    abstractions of the other nodes of a memory graph in a comparable form.
+    """
+    return (
+        {
+            name: sorted(tuple(sorted(a.items())) for a in abstractions)
+            for name, abstractions in memory_graph.vertexAbstractionEPs().items()
+        },
+        sorted(
+            tuple(sorted(a.items()))
+            for a in memory_graph.vertexAbstractionOthers()
+        )
+    )
+
+
+def compressChains(
+        vertices: List[Dict],
+        entrypoints: List[Dict],
+        field: str,
+        length: int
+) -> int:
+    """
+    Shortens each chain of nodes along a field to its first `length` nodes and
+    returns the number of removed nodes. The vertices are modified in place.
+
+    A chain is a maximal sequence of nodes `n1, ..., nk`, where the field of
+    each node points to the next node, such that each node
+
+    - is not the target of an entry pointer,
+    - is the target of the field of exactly one node, i.e., its predecessor,
+    - is only pointed to by its predecessor and its successor, and
+    - relates to its predecessor and successor like the other nodes do, i.e.,
+      its fields are `NULL`, point to the node itself, its successor, its
+      predecessor, or the same node outside the chain.
+
+    Thus, the nodes of a chain share their vertex abstraction, and the chain
+    ends at `NULL` targets, back pointers and cycles through other nodes. For
+    the remaining nodes `n1, ..., nl` of a shortened chain, the fields of `nl`
+    pointing to its successor are redirected to the successor of `nk`, whose
+    fields pointing to `nk` are redirected to `nl`.
+    """
+    id2vertex = {v['id']: v for v in vertices}
+    targets = {
+        v['id']: {a['name']: a['value'] for a in v['assignment']}
+        for v in vertices
+    }
+    successor = {id: assignment.get(field) for id, assignment in targets.items()}
+    predecessors = {id: set() for id in id2vertex}
+    fieldPredecessors = {id: [] for id in id2vertex}
+    for id, assignment in targets.items():
+        for value in assignment.values():
+            if value in predecessors and value != id:
+                predecessors[value].add(id)
+        if successor[id] in fieldPredecessors:
+            fieldPredecessors[successor[id]].append(id)
+    eps = {ep['target'] for ep in entrypoints}
+
+    def pattern(id: str) -> tuple:
+        next_ = successor[id]
+        if id in eps or next_ not in id2vertex or next_ == id:
+            return None
+        if len(fieldPredecessors[id]) != 1:
+            return None
+        prev = fieldPredecessors[id][0]
+        if prev == id or not predecessors[id] <= {prev, next_}:
+            return None
+        relations = []
+        for name, value in sorted(targets[id].items()):
+            if value == constants.NULL_UPPER:
+                relations.append((name, constants.NULL_LOWER))
+            elif value == id:
+                relations.append((name, 'This'))
+            elif value == next_:
+                relations.append((name, 'next'))
+            elif value == prev:
+                relations.append((name, 'prev'))
+            else:
+                relations.append((name, 'node', value))
+        return tuple(relations)
+
+    patterns = {id: pattern(id) for id in id2vertex}
+
+    removed = set()
+    for vertex in vertices:
+        id = vertex['id']
+        if patterns[id] is None:
+            continue
+        # only start at the first node of a chain
+        if patterns.get(fieldPredecessors[id][0]) == patterns[id]:
+            continue
+        chain = [id]
+        while patterns.get(successor[chain[-1]]) == patterns[id] \
+                and successor[chain[-1]] not in chain[:1]:
+            chain.append(successor[chain[-1]])
+        if len(chain) <= length:
+            continue
+
+        last = chain[length - 1]
+        after = successor[chain[-1]]
+        for a in id2vertex[last]['assignment']:
+            if a['value'] == chain[length]:
+                a['value'] = after
+        for a in id2vertex[after]['assignment']:
+            if a['value'] == chain[-1]:
+                a['value'] = last
+        removed.update(chain[length:])
+
+    vertices[:] = [v for v in vertices if v['id'] not in removed]
+    return len(removed)
@@ -74,6 +74,14 @@ TIMEOUT_PROLOG = 180
 Timeout for the prolog interpreter.
 '''
 
+TIMEOUT_LEARN_ATTEMPTS = 1800
+'''
+Overall timeout in seconds of the attempts of `learn.learn` to learn from
+samples or compressed memory graphs before learning from the original memory
+graphs, including the confirmations of the learned shape predicates. Each
+attempt is given an equal slice of the time left for the pending attempts.
+'''
+
 BIN_VERIFAST = 'verifast'
 '''
 Command line name for the verifast program verifier executable.
@@ -88,6 +96,33 @@ Denotes the folder in which rules templates are stored.
 
 LIMIT_PARAMS = 3
 
+PRUNING_SHARD_SIZE = 20000
+'''
+Denotes the number of candidate rules per shard during the rule pruning, see
+`pruning.pruneRules`.
+'''
+
+ESTIMATE_PRUNE_SHARDS = 5
+'''
+Denotes the number of shards of `PRUNING_SHARD_SIZE` candidate rules up to
+which a dry run prunes a complexity level by default, see
+`estimate.estimate`.
+'''
+
+PRUNING_PROCESSES = None
+'''
+Denotes the number of processes conducting the rule pruning, where `None`
+denotes the number of CPUs and `1` disables the process pool.
+'''
+
+PRUNING_PARALLEL_THRESHOLD = 20000
+'''
+Denotes the number of candidate rules per process of the process pool of the
+rule pruning, see `pruning.pruneRules`. A process takes about 25ms to start
+and stop, whereas a rule takes about 6us to prune, such that a process only
+pays off if it prunes several thousand rules.
+'''
+
 COMPARATORS_DEFAULT = [
     (pruning.comparator_pname, 1),
     (pruning.comparator_calls, 1),
@@ -95,3 +130,70 @@ COMPARATORS_DEFAULT = [
     (pruning.comparator_nullParams, 1),
     (pruning.comparator_paramsAsArgs, 1)
 ]
+
+MODEL_COMPARATORS = {
+    'comparator_calls': pruning.comparator_calls,
+    'comparator_nullArgs': pruning.comparator_nullArgs,
+    'comparator_nullParams': pruning.comparator_nullParams,
+    'comparator_paramsAsArgs': pruning.comparator_paramsAsArgs,
+    'comparator_nullFields': pruning.comparator_nullFields
+}
+'''
+Maps the name of each comparator of module `pruning` that may serve as a
+feature of a rule ordering model to the comparator, see
+`pruning.modelComparators`.
+'''
+
+MODEL_FEATURES = [
+    'comparator_calls',
+    'comparator_nullArgs',
+    'comparator_nullParams',
+    'comparator_paramsAsArgs',
+    'comparator_nullFields'
+]
+'''
+Denotes the names of the comparators of module `pruning` whose features are
+used by a rule ordering model by default, see `pruning.trainOrderingModel`.
+Each name must be a key of `MODEL_COMPARATORS`.
+'''
+
+CANONICAL_HASH_ROUNDS = 10
+'''
+Denotes the maximal number of Weisfeiler-Lehman refinement rounds conducted to
+compute the canonical hash of a memory graph, see
+`model.MemoryGraph.canonicalHash`.
+'''
+
+COMPRESSION_RUN_LENGTH = 3
+'''
+Denotes the number of nodes that are kept of each homogeneous chain of nodes
+when a memory graph is compressed before the search, see
+`compression.compress`. `None` disables the compression.
+'''
+
+COMPRESSION_THRESHOLD = 1000
+'''
+Denotes the number of nodes of a memory graph above which memory graphs are
+compressed before the search, see `learn.learn`. Compressing smaller memory
+graphs saves little search time but adds an attempt that may yield a less
+concise shape predicate. `None` disables the compression.
+'''
+
+SAMPLING_THRESHOLD = 5000
+'''
+Denotes the number of nodes of a memory graph above which shape predicates are
+first learned from bounded-size samples of the memory graphs, see
+`sampling.samples`. `None` disables the sampling.
+'''
+
+SAMPLING_SIZE = 250
+'''
+Denotes the initial number of nodes of a sample, which is doubled whenever the
+shape predicate learned from the samples is not confirmed.
+'''
+
+SAMPLING_MAX_SAMPLES = 8
+'''
+Denotes the maximal number of samples drawn from a memory graph per sample
+size, see `sampling.sample`.
+'''
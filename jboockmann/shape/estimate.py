@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Provides means to estimate the size of the search space of `learn.learn`
+without conducting the search itself.
+"""
+
+import itertools
+from typing import Dict, List
+
+from . import constants
+from . import helper
+from . import learn
+from . import rules
+from .model import MemoryGraph
+from .helper import logger
+
+
+def estimate(
+        memory_graphs: List[MemoryGraph],
+        prune: bool = True,
+        prune_limit: int = None
+) -> List[Dict]:
+    """
+    Estimates the size of each complexity level searched by `learn.learn`
+    for the memory graphs, assuming that the search of every level fails.
+    The levels of each attempt of `learn.learn` are estimated on the memory
+    graphs of the attempt, see `learn.preliminary_attempts`, and their
+    candidate rules are synthesized and pruned as for the search, see
+    `learn.level_rules`. For each level, the result contains the following
+    attributes:
+
+    - `attempt`: the attempt of `learn.learn`
+    - `p_arity`, `p_calls`, `entry_calls`: the complexity of the level
+    - `candidates`: the exact number of candidate rules, see `rules.countCandidates`
+    - `pruned`: the number of rules searched after pruning, or `None`
+    - `skipped`: whether the level is covered by a preceding level and not searched
+    - `exact`: whether `pruned` and `cost` are exact
+    - `cost`: the predicted cost of the search, see below
+
+    Pruning requires the candidate rules to be synthesized. It is skipped if
+    `prune` is false or the number of candidate rules exceeds `prune_limit`,
+    which defaults to `constants.ESTIMATE_PRUNE_SHARDS` shards of
+    `constants.PRUNING_SHARD_SIZE` candidate rules. The cost is `rules.cost`
+    of the rules searched times the number of nodes of the memory graphs.
+    For a level that is not pruned, it is that of all candidate rules, which
+    is an upper bound, and the level is not exact. As its pruned candidate
+    rules are unknown, such a level never covers a later level, so that the
+    later levels may be estimated although `learn.learn` skips them.
+
+    :param memory_graphs: A non-empty list of homogeneously typed memory graphs.
+    :param prune: Whether to count the candidate rules after pruning.
+    :param prune_limit: The maximal number of candidate rules to be pruned.
+    :return: A list containing a dictionary for each complexity level.
+    """
+    if prune_limit is None:
+        prune_limit = constants.ESTIMATE_PRUNE_SHARDS * constants.PRUNING_SHARD_SIZE
+    memory_graphs = helper.unique_memory_graphs(memory_graphs)
+    attempts, _ = learn.preliminary_attempts(memory_graphs)
+
+    levels = []
+    for attempt, attempt_graphs in itertools.chain(
+            attempts, [('full', memory_graphs)]
+    ):
+        levels.extend(
+            estimate_complexities(attempt_graphs, attempt, prune, prune_limit)
+        )
+    inexact = [level for level in levels if not level['exact']]
+    if prune and inexact:
+        logger().info(
+            f'{len(inexact)} of {len(levels)} complexity levels exceed the '
+            f'limit of {prune_limit} candidate rules and were not pruned'
+        )
+    return levels
+
+
+def estimate_complexities(
+        memory_graphs: List[MemoryGraph],
+        attempt: str,
+        prune: bool,
+        prune_limit: int
+) -> List[Dict]:
+    """
+    Estimates the complexity levels of a single attempt, see `estimate`.
+
+    :param memory_graphs: A non-empty list of unique memory graphs.
+    :param attempt: The attempt of `learn.learn` the levels are tagged with.
+    :param prune: Whether to count the candidate rules after pruning.
+    :param prune_limit: The maximal number of candidate rules to be pruned.
+    :return: A list containing a dictionary for each complexity level.
+    """
+    fields = memory_graphs[0].fields()
+    ep_count = len(memory_graphs[0].entrypoints())
+    nodes = sum(len(g.vertexIds()) for g in memory_graphs)
+
+    # candidate rules of each preceding level, all of which are assumed to fail
+    failed = []
+
+    levels = []
+    complexities = rules.schedule(
+        rules.generator(fields, ep_count, memory_graphs),
+        memory_graphs
+    )
+    for complexity in complexities:
+        candidates = rules.countCandidates(complexity)
+        level = {
+            'attempt': attempt,
+            'p_arity': complexity['p_arity'],
+            'p_calls': len(complexity['p_calls']),
+            'entry_calls': len(complexity['entry_calls']),
+            'candidates': candidates,
+            'pruned': None,
+            'skipped': False,
+            'exact': False,
+            'cost': rules.cost(complexity) * nodes
+        }
+        if prune and candidates <= prune_limit:
+            searched = learn.level_rules(complexity, memory_graphs, failed)
+            level['exact'] = True
+            if searched is None:
+                level.update(skipped=True, cost=0)
+            else:
+                rules_, _, pruned = searched
+                failed.append(pruned)
+                level.update(
+                    pruned=len(rules_),
+                    cost=rules.cost(complexity, rules_) * nodes
+                )
+        levels.append(level)
+        logger().debug(f'estimated complexity level: {level}')
+    return levels
@@ -4,6 +4,7 @@ Provides multiple reusable helper functions.
 '''
 
 import functools
+import html
 import itertools
 import json
 import logging
@@ -14,9 +15,6 @@ import time
 from itertools import chain, combinations
 from typing import Callable, Dict, List, Tuple
 
-import bs4
-import pydot
-
 from . import model, constants
 
 
@@ -32,6 +30,38 @@ def boundVars(rule: str) -> List[str]:
     return sorted(list(set(vars_)))
 
 
+def entryPattern(values: List[str]) -> Tuple:
+    '''
+    Computes the pattern of a list of values, e.g., the parameters of an entry
+    rule head or the targets of the entry pointers of a memory graph. In this
+    pattern, `null` values are kept and any other value is replaced by the
+    position of its first occurrence among the non-null values. Hence, the
+    pattern captures which values are `null` and which values are equal.
+
+    For example, the values `['n1', 'null', 'n2', 'n1']` yield `(0, 'null', 1,
+    0)` and the values `['This', 'null', 'Par2', 'This']` yield the same
+    pattern.
+
+    The pattern deliberately only relates the values among each other. It does
+    not capture whether an entry pointer points into a field of the node of
+    another entry pointer, e.g., to `n2` with `next(n1, n2)`, since the head of
+    an entry rule does not refer to fields. Such a relation merely requires the
+    field assignment of an entry rule to use the corresponding parameter, e.g.,
+    `next(This, Par1)`, which is checked by function
+    `pruning.pruneByEntryPointerFields`.
+    '''
+    classes = []
+    pattern = []
+    for value in values:
+        if value in [constants.NULL_LOWER, constants.NULL_UPPER]:
+            pattern.append(constants.NULL_LOWER)
+            continue
+        if value not in classes:
+            classes.append(value)
+        pattern.append(classes.index(value))
+    return tuple(pattern)
+
+
 def relevantEPname(rule, memoryGraph: model):
     head, _ = rule.split(constants.DELIMITER_RULE)
     params = head.split("(")[1].split(")")[0].split(", ")
@@ -81,6 +111,45 @@ def timer(func: Callable) -> Callable:
     return wrapper_timer
 
 
+_DSI_TOKENS = re.compile(
+    r'''
+      subgraph\s+(?P<subgraph>\w+)\s*\{
+    | (?P<close>\})
+    | "(?P<source>\d+)":"(?P<sourceport>[^"]*)"\s*->\s*"(?P<destination>\d+)"
+    | (?:\w+|"[^"]*")\s*\[\s*label\s*=\s*<(?P<label><TABLE.*?</TABLE>)>
+    ''',
+    re.VERBOSE | re.DOTALL | re.IGNORECASE
+)
+'''
+Lexer for the DOT dialect of the points-to graphs captured by *DSI*, see
+function `pointstograph_to_JSON`. It matches the beginning and end of
+subgraphs, edges and nodes with their HTML table label.
+'''
+
+_DSI_ROWS = re.compile(r"<TR>(.*?)</TR>", re.DOTALL | re.IGNORECASE)
+_DSI_CELLS = re.compile(r"<TD([^>]*)>(.*?)</TD>", re.DOTALL | re.IGNORECASE)
+_DSI_PORT = re.compile(r'PORT="([^"]*)"', re.IGNORECASE)
+_DSI_TAGS = re.compile(r"<[^>]*>")
+
+
+def _dsi_table_rows(label: str) -> List[List[Tuple[str, str]]]:
+    '''
+    Returns the rows of the HTML table label of a *DSI* node, where each cell
+    is given by its port and its text.
+    '''
+    rows = []
+    for row in _DSI_ROWS.findall(label):
+        cells = []
+        for attributes, content in _DSI_CELLS.findall(row):
+            port = _DSI_PORT.search(attributes)
+            cells.append((
+                port.group(1) if port else "",
+                html.unescape(_DSI_TAGS.sub("", content))
+            ))
+        rows.append(cells)
+    return rows
+
+
 def pointstograph_to_JSON(data) -> Dict:
     '''
     Transforms points-to graphs (DOT format) captured using the *DSI: Data
@@ -97,74 +166,74 @@ def pointstograph_to_JSON(data) -> Dict:
     a list rather than the first element of that list.
 
     Converts a points-to graph (PTG) generated by the DSI tool from DOT format
-    to JSON format.
+    to JSON format. The DOT file is read in a single pass using the lexer
+    `_DSI_TOKENS` for the DOT dialect of DSI, which is not compliant with the
+    DOT standard, and the rows of the HTML labels are extracted directly.
     '''
-    # NOTE: The points-to graphs generated by DSI are not compliant with the DOT
-    # standard. This function patches the content of such a DOT file and makes
-    # it standard compliant.
-    data = data.replace(r'label = <', r'label=<')
-
-    graphs = pydot.graph_from_dot_data(data)
-
     # the final output comprises the following chunks of data
     vertices: List = []
     structs: List = []
     entrypoints: List = []
 
+    # temporary dicts to look up vertices and structs by their ID and name
+    id2vertex: Dict = {}
+    name2struct: Dict = {}
+
     # temporary dict to store a mapping from DOT ports to struct field names
     port2fieldname: Dict = {}
 
-    assert len(graphs) == 1
-    graph = graphs[0]
-    graph: pydot.Dot = graph
-    subgraphs = [
-        sg for sg in graph.get_subgraphs()
-        if sg.get_name() == "connected_vertices"
-    ]
-    assert len(subgraphs) == 1
-    subgraph: pydot.Subgraph = subgraphs[0]
-
-    # reconstruct struct information and vertices excluding assignment information
-    for node in subgraph.get_nodes():
-        node: pydot.Node = node
-
-        html = bs4.BeautifulSoup(node.get("label")[1:][:-1], features="lxml")
-
-        table_data = [
-            [cell.text.split(", ") for cell in row("td")]
-            for row in html("tr")
-        ]
-
-        # the NULL and UNDEF node can be ignored
-        if table_data[2][0][0] in ["NULL", "UNDEF"]:
-            continue
-
-        struct_name = table_data[2][1][0].replace("struct ", "")
-
-        # ignore the duplicate void * pointers caused by the CIL instrumentation
-        # also ignore any other pointers
-        if struct_name.endswith(" *"):
-            continue
-
-        field_types = [
-            x[1][0]
-            for x in table_data[3:-1]
-            if x[0][0] != "compiler padding"
-        ]
-        field_names = [
-            x[0][0]
-            for x in table_data[3:-1]
-            if x[0][0] != "compiler padding"
-        ]
-        type_name = list(zip(field_types, field_names))
-
-        # only keep pointer fields, e.g., drop integers
-        type_name = [x for x in type_name if x[0].endswith("*")]
-
-        # reconstruct the struct definition if we have not done so far
-        if struct_name not in [x["name"] for x in structs]:
-            structs.append(
-                {
+    # only the edges of the graph itself are considered, i.e., the edges
+    # outside any subgraph
+    edges: List = []
+
+    subgraph = None
+    for token in _DSI_TOKENS.finditer(data):
+        if token.group("subgraph"):
+            subgraph = token.group("subgraph")
+        elif token.group("close"):
+            subgraph = None
+        elif token.group("source"):
+            if subgraph is None:
+                edges.append(
+                    (token.group("source"), token.group("sourceport"),
+                     token.group("destination"))
+                )
+        elif subgraph == "connected_vertices":
+            rows = _dsi_table_rows(token.group("label"))
+            table_data = [
+                [text.split(", ") for _, text in row]
+                for row in rows
+            ]
+
+            # the NULL and UNDEF node can be ignored
+            if table_data[2][0][0] in ["NULL", "UNDEF"]:
+                continue
+
+            struct_name = table_data[2][1][0].replace("struct ", "")
+
+            # ignore the duplicate void * pointers caused by the CIL
+            # instrumentation also ignore any other pointers
+            if struct_name.endswith(" *"):
+                continue
+
+            field_types = [
+                x[1][0]
+                for x in table_data[3:-1]
+                if x[0][0] != "compiler padding"
+            ]
+            field_names = [
+                x[0][0]
+                for x in table_data[3:-1]
+                if x[0][0] != "compiler padding"
+            ]
+            type_name = list(zip(field_types, field_names))
+
+            # only keep pointer fields, e.g., drop integers
+            type_name = [x for x in type_name if x[0].endswith("*")]
+
+            # reconstruct the struct definition if we have not done so far
+            if struct_name not in name2struct:
+                name2struct[struct_name] = {
                     "name": struct_name,
                     "fields": [
                         {
@@ -174,11 +243,10 @@ def pointstograph_to_JSON(data) -> Dict:
                         for (typex, namex) in type_name
                     ]
                 }
-            )
+                structs.append(name2struct[struct_name])
 
-        # adding vertex entry
-        vertices.append(
-            {
+            # adding vertex entry
+            vertex = {
                 "id": table_data[0][0][0],
                 "struct": "struct %s" % struct_name,
                 "assignment": [
@@ -187,41 +255,37 @@ def pointstograph_to_JSON(data) -> Dict:
                         "name": field["name"],
                         "value": None
                     }
-                    for field in [x["fields"] for x in structs if x["name"] == struct_name][0]
+                    for field in name2struct[struct_name]["fields"]
                 ]
             }
-        )
-
-        # updating port2fieldname dict
-        refindall = re.findall(
-            r"in\">(\w+)(?:.*?)port=\"(\d+)out\"></td></tr>",
-            str(html)
-        )
-        for fieldname, port in refindall:
-            port2fieldname[port] = fieldname
+            vertices.append(vertex)
+            id2vertex.setdefault(vertex["id"], vertex)
+
+            # updating port2fieldname dict, a field row starts with the field
+            # name at an `in` port and ends with an empty `out` port, which may
+            # also be the one of a later row
+            fieldname = None
+            for row in rows:
+                for port, text in row:
+                    match = re.match(r"\w+", text)
+                    if fieldname is None and port.endswith("in") and match:
+                        fieldname = match.group()
+                port, text = row[-1]
+                match = re.fullmatch(r"(\d+)out", port)
+                if fieldname is not None and match and not text:
+                    port2fieldname[match.group(1)] = fieldname
+                    fieldname = None
 
     # reconstrucing assignment information, i.e., the edges of the graph
-    for x in graph.get_edges():
-        x: pydot.Edge = x
-
-        node_source_id = re.match(
-            r"\"\d+\"\:", x.get_source()
-        ).group()[1:][:-2]
-
+    for node_source_id, source_port, node_destination_id in edges:
         # ignore edges from entry points
-        if node_source_id not in [v["id"] for v in vertices]:
+        if node_source_id not in id2vertex:
             continue
 
-        node_source_port = re.findall(
-            r"\"(\d+)out:e\"", x.get_source()
-        )[0]
+        node_source_port = re.findall(r"(\d+)out:e$", source_port)[0]
 
         field = port2fieldname[node_source_port]
 
-        node_destination_id = re.match(
-            r"\"\d+\"\:", x.get_destination()
-        ).group()[1:][:-2]
-
         # DSI encodes the NULL value as a node with id 1 and apparently
         # sometimes with a 0 ...
         if node_destination_id in ["0", "1"]:
@@ -230,12 +294,8 @@ def pointstograph_to_JSON(data) -> Dict:
             value = str(node_destination_id)
 
         # update the value information in the assignment of the node
-        my_vertex = [
-            v for v in vertices
-            if v["id"] == node_source_id
-        ][0]
         my_assignment = [
-            a for a in my_vertex["assignment"]
+            a for a in id2vertex[node_source_id]["assignment"]
             if a["name"] == field
         ][0]
         my_assignment["value"] = value
@@ -308,6 +368,14 @@ class ShaPEexception(Exception):
         return repr(self.value)
 
 
+class ShaPEtimeout(ShaPEexception):
+    '''
+    Raised if an external tool, e.g., the Prolog interpreter, exceeds its
+    timeout. In contrast to its base class, the exception does not imply that
+    the computation would have failed without the timeout.
+    '''
+
+
 class Unique:
     '''
     A singleton class serving as a unique number generator throughout the
@@ -433,6 +501,30 @@ def extractFieldNames(
     return fields
 
 
+def unique_memory_graphs(
+    memory_graphs
+) -> List:
+    """
+    Drops memory graphs that are isomorphic to a preceding memory graph, i.e.,
+    that only differ in the IDs of their nodes, see `MemoryGraph.canonicalHash`.
+
+    :param memory_graphs: The input memory graphs.
+    :return: The first memory graph of each isomorphism class in input order.
+    """
+    hashes = set()
+    unique = []
+    for memory_graph in memory_graphs:
+        hash_ = memory_graph.canonicalHash()
+        if hash_ in hashes:
+            continue
+        hashes.add(hash_)
+        unique.append(memory_graph)
+    if len(unique) < len(memory_graphs):
+        logger().debug(
+            f'dropped {len(memory_graphs) - len(unique)} isomorphic memory graphs')
+    return unique
+
+
 def homogeneously_typed(
     memory_graphs
 ) -> None:
@@ -3,44 +3,243 @@
 Provides means to learn a shape predicate from homogeneously typed memory graphs.
 """
 
-from typing import List
+import itertools
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
+from . import compression
+from . import constants
+from . import helper
 from . import pruning
 from . import search
 from . import rules
+from . import sampling
 from .model import MemoryGraph
-from .helper import ShaPEexception, logger, timer
+from .helper import ShaPEexception, ShaPEtimeout, logger, timer
 
 
 @timer
-def learn(memory_graphs: List[MemoryGraph]) -> List[str]:
+def learn(
+        memory_graphs: List[MemoryGraph],
+        model: Dict = None,
+        statistics: List[Dict] = None
+) -> List[str]:
     """
     Infers a shape predicate from homogeneously typed memory graphs.
 
+    The complexity levels yielded by `rules.generator` are searched in the
+    order determined by `rules.schedule`. A level whose search failed proves
+    that no subset of its candidate rules forms a shape predicate. Hence, any
+    solution at a later level must contain at least one rule that is not among
+    the candidate rules of a failed level. This is passed to the search as a
+    constraint, and a level whose candidate rules are already covered by a
+    failed level is skipped entirely. Levels that failed due to a timeout do
+    not provide such a guarantee and are not taken into account.
+
+    Moreover, entry rules that are not canonical wrt. the order of the
+    parameters of `p` are dropped for a single memory graph, see function
+    `pruning.pruneParameterPermutations`. Memory graphs that are isomorphic to
+    a preceding memory graph are dropped, see `helper.unique_memory_graphs`.
+
+    Finally, long homogeneous chains of nodes are shortened beforehand if a
+    memory graph has more than `constants.COMPRESSION_THRESHOLD` nodes, see
+    `compression.compress`, and huge memory graphs are first learned from
+    samples of growing size, see `sampling.samples`. A shape predicate learned
+    for the samples or the compressed memory graphs is confirmed on the
+    original memory graphs, which are only searched themselves if no
+    confirmation succeeds, see `preliminary_attempts`. These attempts share the
+    timeout `constants.TIMEOUT_LEARN_ATTEMPTS`, which each attempt splits
+    evenly with the pending ones, including the confirmations.
+
     :param memory_graphs: A non-empty list of homogeneously typed memory graphs.
+    :param model: An optional rule ordering model, see `pruning.trainOrderingModel`.
+    :param statistics: An optional list, to which the attempt, the complexity and the pruning statistics of each searched level are appended.
     :return: A shape predicate.
     """
 
+    # isomorphic memory graphs impose the same constraints
+    memory_graphs = helper.unique_memory_graphs(memory_graphs)
+
+    # a shape predicate learned for samples of growing size of the compressed
+    # memory graphs, or for the compressed memory graphs, must be confirmed on
+    # the original ones, otherwise they are learned from scratch
+    attempts, pending = preliminary_attempts(memory_graphs)
+    deadline = time.monotonic() + constants.TIMEOUT_LEARN_ATTEMPTS
+    for attempt, attempt_graphs in attempts:
+        now = time.monotonic()
+        if now >= deadline:
+            logger().debug('the attempts exceeded their overall timeout')
+            break
+        slice_ = (deadline - now) / pending
+        pending -= 1
+        try:
+            predicate = learn_complexities(
+                attempt_graphs, model, statistics,
+                attempt=attempt, deadline=now + slice_
+            )
+            # the confirmation is part of the attempts' overall timeout
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                raise ShaPEtimeout(
+                    f'attempt {attempt} could not be confirmed in time')
+            return search.search(
+                predicate, memory_graphs,
+                timeout=min(timeout, constants.TIMEOUT_PROLOG)
+            )
+        except ShaPEexception:
+            logger().debug(
+                f'the predicate of attempt {attempt} could not be confirmed')
+    return learn_complexities(memory_graphs, model, statistics, attempt='full')
+
+
+def preliminary_attempts(
+        memory_graphs: List[MemoryGraph]
+) -> Tuple[Iterator[Tuple[str, List[MemoryGraph]]], int]:
+    """
+    Determines the attempts of `learn` preceding the search of the original
+    memory graphs, i.e., the samples of growing size of the compressed
+    memory graphs followed by the compressed memory graphs themselves.
+
+    :param memory_graphs: A non-empty list of unique memory graphs.
+    :return: The attempts with their unique memory graphs, and their number.
+    """
+    compressed = memory_graphs
+    largest = max(len(g.vertexIds()) for g in memory_graphs)
+    if constants.COMPRESSION_THRESHOLD is not None \
+            and largest > constants.COMPRESSION_THRESHOLD:
+        compressed = [compression.compress(g) for g in memory_graphs]
+    attempts = (
+        (f'samples {pos}', helper.unique_memory_graphs(samples))
+        for pos, samples in enumerate(sampling.samples(compressed), 1)
+    )
+    count = sampling.rounds(compressed)
+    if any(c is not g for c, g in zip(compressed, memory_graphs)):
+        attempts = itertools.chain(
+            attempts, [('compressed', helper.unique_memory_graphs(compressed))]
+        )
+        count += 1
+    return attempts, count
+
+
+def learn_complexities(
+        memory_graphs: List[MemoryGraph],
+        model: Dict = None,
+        statistics: List[Dict] = None,
+        attempt: str = 'full',
+        deadline: float = None
+) -> List[str]:
+    """
+    Searches the complexity levels for a shape predicate, see `learn`.
+
+    :param memory_graphs: A non-empty list of homogeneously typed memory graphs.
+    :param model: An optional rule ordering model, see `pruning.trainOrderingModel`.
+    :param statistics: An optional list, to which the statistics of each searched level are appended.
+    :param attempt: The attempt of `learn` the statistics are tagged with.
+    :param deadline: An optional `time.monotonic` time at which the search is aborted.
+    :return: A shape predicate.
+    :raises ShaPEtimeout: If the deadline has passed.
+    """
     fields = memory_graphs[0].fields()
     ep_count = len(memory_graphs[0].entrypoints())
 
-    for complexity in rules.generator(fields, ep_count):
+    # candidate rules of each level whose search failed
+    failed = []
+
+    # the MI tries rules matching many vertices first
+    frequencies = pruning.abstractionFrequencies(memory_graphs)
+
+    complexities = rules.schedule(
+        rules.generator(fields, ep_count, memory_graphs),
+        memory_graphs
+    )
+    for complexity in complexities:
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                raise ShaPEtimeout(f'attempt {attempt} exceeded its time slice')
+            timeout = min(timeout, constants.TIMEOUT_PROLOG)
         logger().debug(
             f'using complexity {complexity}'
         )
-        rules_ = rules.generateRules(
-            complexity
-        )
-        logger().debug(
-            f'rules before pruning: {len(rules_)}'
-        )
-        rules_ = pruning.pruneRules(rules_, memory_graphs)
-        logger().debug(
-            f'rules after pruning: {len(rules_)}'
+        pruning_statistics = pruning.PruningStatistics()
+        level = level_rules(
+            complexity, memory_graphs, failed, statistics=pruning_statistics
         )
+        if statistics is not None:
+            statistics.append({
+                'attempt': attempt,
+                'complexity': complexity,
+                'pruning': pruning_statistics.asList()
+            })
+        if level is None:
+            continue
+        rules_, required, candidates = level
 
         try:
-            return search.search(rules_, memory_graphs)
-        except ShaPEexception:
+            return search.search(
+                rules_, memory_graphs, required=required, model=model,
+                frequencies=frequencies, timeout=timeout
+            )
+        except ShaPEtimeout:
             pass
+        except ShaPEexception:
+            failed.append(candidates)
     raise ShaPEexception('could not find a matching shape predicate')
+
+
+def level_rules(
+        complexity: Dict,
+        memory_graphs: List[MemoryGraph],
+        failed: List[Set[str]],
+        statistics: pruning.PruningStatistics = None
+) -> Optional[Tuple[List[str], List[List[str]], Set[str]]]:
+    """
+    Synthesizes and prunes the candidate rules of a complexity level as they
+    are searched by `learn_complexities`.
+
+    :param complexity: The complexity level.
+    :param memory_graphs: A non-empty list of unique memory graphs.
+    :param failed: The candidate rules of each level whose search failed.
+    :param statistics: Optional pruning statistics, see `pruning.PruningStatistics`.
+    :return: The searched, required and candidate rules, or `None` if covered by a failed level.
+    """
+    rules_ = rules.generateRules(
+        complexity
+    )
+    logger().debug(
+        f'rules before pruning: {len(rules_)}'
+    )
+    rules_ = pruning.pruneRules(
+        rules_, memory_graphs, statistics=statistics
+    )
+    logger().debug(
+        f'rules after pruning: {len(rules_)}'
+    )
+
+    candidates = set(rules_)
+    if any(candidates <= f for f in failed):
+        logger().debug(
+            'skipping complexity, its rules have already been searched'
+        )
+        return None
+    # any solution must contain a rule that is new wrt. each failed level
+    required = [
+        [r for r in rules_ if r not in f]
+        for f in failed if candidates & f
+    ]
+    logger().debug(
+        f'new rules wrt. failed levels: {[len(r) for r in required]}'
+    )
+
+    # a single memory graph is matched by a single entry rule, which is
+    # kept in one order of the parameters of `p`, the failed levels still
+    # cover the whole permutation classes
+    if len(memory_graphs) == 1:
+        rules_ = pruning.pruneParameterPermutations(rules_)
+        kept = set(rules_)
+        required = [[r for r in r_ if r in kept] for r_ in required]
+        logger().debug(
+            f'rules after symmetry breaking: {len(rules_)}'
+        )
+    return rules_, required, candidates
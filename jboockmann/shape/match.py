@@ -82,7 +82,7 @@ def match_predicate(
     """
     search.search(
         predicate,
-        memory_graphs
+        helper.unique_memory_graphs(memory_graphs)
     )
 
 
@@ -103,7 +103,7 @@ def derive_predicates(
 
     template_fields = helper.extractFieldNames(template)
 
-    if len(memory_graphs[0].json['structs'][0]['fields']) != len(template_fields):
+    if len(memory_graphs[0].structs()[0]['fields']) != len(template_fields):
         raise ShaPEexception(
             'Number of struct fields in template do not match the number of fields present in the memory graphs.'
         )
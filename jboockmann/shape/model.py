@@ -4,10 +4,16 @@ Provides the `MemoryGraph` class as a means to encode
 and operate on memory graphs.
 '''
 
+import copy
+import hashlib
 import json
+import mmap
 import re
-from typing import Dict, List, Union
+import struct
+import sys
+from typing import Dict, List, Tuple, Union
 
+import numpy
 from graphviz.dot import Digraph
 
 from . import constants
@@ -16,7 +22,8 @@ from . import helper
 
 def vertexAbstraction(
         vertices: List[Dict[str, Union[str, List[Dict[str, str]]]]],
-        fields: List[str]
+        fields: List[str],
+        deduplicate: bool = True
 ) -> List[Dict[str, str]]:
     '''
     Computes the node abstraction given a list of vertices and field names as
@@ -37,6 +44,10 @@ def vertexAbstraction(
     For example, the assignment `{'left': '6', 'right': '7'}` yields `{'left':
     'Var0', 'right': 'Var1'}`. Whereas the assignment `{'left': '8', 'right':
     '8'}` yields `{'left': 'Var0', 'right': 'Var0'}`.
+
+    Duplicate abstractions are dropped, unless `deduplicate` is `False`, in
+    which case the abstraction of each vertex is returned in the order of the
+    vertices, e.g., to count how often an abstraction occurs.
     '''
     abstractions = []
     for vertex in vertices:
@@ -60,11 +71,281 @@ def vertexAbstraction(
                     abstraction[field] = f'Var{varCtr}'
                     varCtr += 1
         abstractions.append(abstraction)
+    if not deduplicate:
+        return abstractions
     result = [dict(t) for t in {tuple(sorted(d.items()))
                                 for d in abstractions}]
     return result
 
 
+def encodeVertexAbstractions(targets: numpy.ndarray, this: numpy.ndarray) -> numpy.ndarray:
+    '''
+    Computes the node abstraction of many vertices at once, see function
+    `vertexAbstraction`, given the targets of their fields as a matrix with one
+    row per vertex and one column per field, where `-1` encodes `NULL`, and
+    the ID of each vertex in `this`, both encoded as integers. Each field is
+    encoded as `-1` for `null`, `-2` for `This` and otherwise as the position
+    of the first field with the same target, which is the encoding of function
+    `pruning.encodeAssignment`. The encoding is decoded using function
+    `decodeVertexAbstraction`.
+    '''
+    encoded = numpy.empty_like(targets)
+    for pos in range(targets.shape[1]):
+        code = numpy.full(targets.shape[0], pos, dtype=targets.dtype)
+        for previous in reversed(range(pos)):
+            code[targets[:, pos] == targets[:, previous]] = previous
+        code[targets[:, pos] == this] = -2
+        code[targets[:, pos] == -1] = -1
+        encoded[:, pos] = code
+    return encoded
+
+
+def decodeVertexAbstraction(encoded: List[int], fields: List[str]) -> Dict[str, str]:
+    '''
+    Decodes a node abstraction encoded by function `encodeVertexAbstractions`.
+    '''
+    abstraction = {}
+    varCtr = 0
+    for pos, code in enumerate(encoded):
+        if code == -1:
+            abstraction[fields[pos]] = constants.NULL_LOWER
+        elif code == -2:
+            abstraction[fields[pos]] = 'This'
+        elif code == pos:
+            abstraction[fields[pos]] = f'Var{varCtr}'
+            varCtr += 1
+        else:
+            abstraction[fields[pos]] = abstraction[fields[code]]
+    return abstraction
+
+
+def canonicalForm(
+        vertices: List[Dict[str, Union[str, List[Dict[str, str]]]]],
+        entrypoints: List[Dict[str, str]],
+        structs: List[Dict[str, Union[str, List[Dict[str, str]]]]] = None
+) -> tuple:
+    '''
+    Computes a canonical form of a memory graph given its vertices, entry
+    points and structs, which is equal for two memory graphs if and only if
+    they are isomorphic, i.e., they only differ in the IDs of their nodes. The
+    form respects the structs of the nodes, the fields and their `NULL`
+    targets, the targets without a vertex, and the names of the entry
+    pointers.
+
+    A struct is represented by the names of its fields rather than by its
+    name, since parsers name structs in the order of the input, see, e.g.,
+    `helper.pointstograph_to_JSON`. The field names of a vertex are used for
+    structs missing from `structs`. Targets without a vertex are numbered
+    along with the nodes, such that fields pointing to the same such target
+    are distinguished from fields pointing to different ones. Entry pointers
+    whose target has no vertex are only represented by their names.
+
+    The nodes are colored by their struct and entry pointers. The nodes of
+    each weakly connected component are numbered exactly: the nodes reachable
+    from the entry node with the smallest color, or once no entry node is
+    left, from a node of a source component of the not yet numbered nodes with
+    the smallest color, are numbered in a
+    breadth-first traversal along the fields in alphabetical order. Where
+    several nodes could be picked, the colors are refined by the
+    Weisfeiler-Lehman algorithm along the fields, which stops once the colors
+    are stable or after `constants.CANONICAL_HASH_ROUNDS` rounds. If several
+    nodes still have the smallest color, each choice is tried and the
+    smallest resulting form is kept. This exact fallback only branches for
+    symmetric graphs without entry pointers, but is exponential in the worst
+    case.
+    '''
+    ids = [v['id'] for v in vertices]
+    id2pos = {id: pos for pos, id in enumerate(ids)}
+    names = [[] for _ in ids]
+    danglingEPs = []
+    for ep in entrypoints:
+        if ep['target'] in id2pos:
+            names[id2pos[ep['target']]].append(ep['name'])
+        else:
+            danglingEPs.append(ep['name'])
+
+    dangling = {}
+
+    def target(value: str) -> int:
+        # `NULL` is encoded as -1 and each target without a vertex as a
+        # distinct value below -1
+        if value == constants.NULL_UPPER:
+            return -1
+        if value in id2pos:
+            return id2pos[value]
+        return dangling.setdefault(value, -2 - len(dangling))
+
+    struct2fields = {
+        s['name']: tuple(sorted(f['name'] for f in s['fields']))
+        for s in structs or []
+    }
+    labels = [
+        (
+            struct2fields.get(
+                v['struct'], tuple(sorted(a['name'] for a in v['assignment']))
+            ),
+            tuple(sorted(names[pos]))
+        )
+        for pos, v in enumerate(vertices)
+    ]
+    out = [
+        sorted(
+            ((a['name'], target(a['value'])) for a in v['assignment']),
+            key=lambda a: a[0]
+        )
+        for v in vertices
+    ]
+    inn = [[] for _ in ids]
+    danglingInn = {}
+    for pos, edges in enumerate(out):
+        for field, rnode in edges:
+            if rnode >= 0:
+                inn[rnode].append((field, pos))
+            elif rnode < -1:
+                danglingInn.setdefault(rnode, []).append((field, pos))
+
+    def rank(items: list) -> List[int]:
+        order = {item: pos for pos, item in enumerate(sorted(set(items)))}
+        return [order[item] for item in items]
+
+    colors = rank(labels)
+    refinedColors = []
+
+    def refine() -> List[int]:
+        # Weisfeiler-Lehman refinement of the colors, which is only computed
+        # once several nodes could be picked
+        if refinedColors:
+            return refinedColors[0]
+        refined = colors
+        for _ in range(constants.CANONICAL_HASH_ROUNDS):
+            previous = refined
+            refined = rank([
+                (
+                    previous[pos],
+                    tuple((f, previous[t] if t >= 0 else max(t, -2)) for f, t in out[pos]),
+                    tuple(sorted((f, previous[p]) for f, p in inn[pos]))
+                )
+                for pos in range(len(ids))
+            ])
+            if len(set(refined)) == len(set(previous)):
+                break
+        refinedColors.append(refined)
+        return refined
+
+    node2component = {}
+
+    def strongComponents() -> Dict[int, int]:
+        # strongly connected components, which are only computed once no entry
+        # node is left, see `MemoryGraph.stronglyConnectedComponents`
+        if node2component:
+            return node2component
+        memoryGraph = MemoryGraph.fromJSON({
+            'structs': [],
+            'vertices': [
+                {
+                    'id': str(pos),
+                    'assignment': [
+                        {'name': f, 'value': str(t) if t >= 0 else constants.NULL_UPPER}
+                        for f, t in edges
+                    ]
+                }
+                for pos, edges in enumerate(out)
+            ],
+            'entrypoints': []
+        })
+        for pos, component in enumerate(memoryGraph.stronglyConnectedComponents()):
+            for node in component:
+                node2component[int(node)] = pos
+        return node2component
+
+    def certificate(order: List[int], start: int = 0) -> tuple:
+        numbers = {node: pos for pos, node in enumerate(order)}
+        # targets without a vertex are numbered by their first occurrence
+        for node in order:
+            for _, t in out[node]:
+                if t < -1 and t not in numbers:
+                    numbers[t] = -2 - len(numbers) + len(order)
+        return tuple(
+            (
+                labels[node],
+                tuple((f, numbers[t] if t != -1 else t) for f, t in out[node])
+            )
+            for node in order[start:]
+        )
+
+    def extend(order: List[int], numbered: set, root: int):
+        order = order + [root]
+        numbered = numbered | {root}
+        pos = len(order) - 1
+        while pos < len(order):
+            for _, rnode in out[order[pos]]:
+                if rnode >= 0 and rnode not in numbered:
+                    numbered.add(rnode)
+                    order.append(rnode)
+            pos += 1
+        return order, numbered
+
+    def search(nodes: List[int], order: List[int], numbered: set) -> tuple:
+        while len(order) < len(nodes):
+            # entry nodes or otherwise nodes of source components among the not
+            # yet numbered nodes
+            candidates = [
+                node for node in nodes if node not in numbered and names[node]
+            ]
+            if not candidates:
+                node2component = strongComponents()
+                reached = {
+                    node2component[rnode]
+                    for node in nodes if node not in numbered
+                    for _, rnode in out[node]
+                    if rnode >= 0
+                    and node2component[rnode] != node2component[node]
+                }
+                candidates = [
+                    node for node in nodes
+                    if node not in numbered
+                    and node2component[node] not in reached
+                ]
+            color = min(colors[node] for node in candidates)
+            candidates = [node for node in candidates if colors[node] == color]
+            if len(candidates) > 1:
+                refined = refine()
+                color = min(refined[node] for node in candidates)
+                candidates = [
+                    node for node in candidates if refined[node] == color]
+            extensions = []
+            for node in candidates:
+                order_, numbered_ = extend(order, numbered, node)
+                extensions.append(
+                    (certificate(order_, len(order)), order_, numbered_))
+            smallest = min(e[0] for e in extensions)
+            extensions = [e for e in extensions if e[0] == smallest]
+            if len(extensions) > 1:
+                return min(search(nodes, o, n) for _, o, n in extensions)
+            _, order, numbered = extensions[0]
+        return certificate(order)
+
+    # weakly connected components
+    forms = []
+    visited = set()
+    for root in range(len(ids)):
+        if root in visited:
+            continue
+        visited.add(root)
+        component = [root]
+        for node in component:
+            # nodes sharing a target without a vertex are connected
+            for _, rnode in out[node] + inn[node] + [
+                edge for _, t in out[node] for edge in danglingInn.get(t, [])
+            ]:
+                if rnode >= 0 and rnode not in visited:
+                    visited.add(rnode)
+                    component.append(rnode)
+        forms.append(search(sorted(component), [], set()))
+
+    return (tuple(sorted(forms)), tuple(sorted(danglingEPs)))
+
+
 class MemoryGraph(object):
     '''Encodes a memory graph object and provides functions to retrieve
     values, e.g., `MemoryGraph.vertices` returning all vertices of the graph.
@@ -77,6 +358,79 @@ class MemoryGraph(object):
         '''
         Representation of the memory graph in JSON format.
         '''
+        self._indexedVertices = None
+        '''
+        The list of vertices of the JSON representation the index has been
+        built for, see function `index`.
+        '''
+        self._id2vertex = {}
+        self._capitalizedId2vertices = {}
+        self._successors = {}
+        self._abstractionsKey = None
+        '''
+        The parts of the JSON representation the cached node abstractions have
+        been computed for, see function `vertexAbstractions`.
+        '''
+        self._abstractions = None
+        self._canonicalHashKey = None
+        self._canonicalHash = None
+
+    def index(self) -> None:
+        '''
+        Builds the index of the memory graph unless it is up to date. The index
+        maps the ID of each vertex to the vertex and to its successors, i.e.,
+        the targets of its fields in the order of the assignment, including
+        `NULL` targets.
+
+        The index is rebuilt lazily whenever the list of vertices of the JSON
+        representation has been replaced, which is how memory graphs are
+        patched, e.g., in module `composition`. Functions that modify the
+        vertices in place must call `invalidateIndex` afterwards.
+        '''
+        vertices = self.vertices()
+        if self._indexedVertices is vertices:
+            return
+        self._id2vertex = {}
+        self._capitalizedId2vertices = {}
+        self._successors = {}
+        for vertex in vertices:
+            self._id2vertex[vertex['id']] = vertex
+            self._capitalizedId2vertices.setdefault(
+                vertex['id'].capitalize(), []
+            ).append(vertex)
+            self._successors[vertex['id']] = [
+                (a['name'], a['value']) for a in vertex['assignment']
+            ]
+        self._indexedVertices = vertices
+
+    def invalidateIndex(self) -> None:
+        '''
+        Discards the index and the cached node abstractions, see functions
+        `index` and `vertexAbstractions`.
+        '''
+        self._indexedVertices = None
+        self._abstractionsKey = None
+        self._canonicalHashKey = None
+
+    def vertex(self, id: str) -> Dict[str, Union[str, List[Dict[str, str]]]]:
+        '''
+        Returns the vertex with the given ID.
+        '''
+        self.index()
+        return self._id2vertex[id]
+
+    def successors(self, id: str, fields: List[str] = None) -> List[str]:
+        '''
+        Returns the IDs of the non `NULL` targets of the fields of the vertex
+        with the given ID. The optional parameter `fields` restricts the
+        considered fields.
+        '''
+        self.index()
+        return [
+            value for name, value in self._successors[id]
+            if value != constants.NULL_UPPER
+            and (fields is None or name in fields)
+        ]
 
     def vertices(self) -> List[Dict[str, Union[str, List[Dict[str, str]]]]]:
         '''
@@ -85,6 +439,13 @@ class MemoryGraph(object):
         '''
         return self.json['vertices']
 
+    def vertexIds(self) -> List[str]:
+        '''
+        Returns the IDs of the vertices in the order of the `vertices` section
+        of the JSON string.
+        '''
+        return [vertex['id'] for vertex in self.vertices()]
+
     def structs(self) -> List[Dict[str, Union[str, List[Dict[str, str]]]]]:
         '''
         Returns the structs of the memory graph as denoted in the `structs`
@@ -137,33 +498,95 @@ class MemoryGraph(object):
         different fields. Consider the graph of a binary tree with parent
         pointers where the root node is to be preferred over an inner tree node.
         '''
-        node2nodes = {}
-        for node in self.vertices():
-            node2nodes[node["id"]] = self.reachableNodes(node["id"])
+        # update the entry points of the memory graph
+        self.json["entrypoints"] = self._detectedEntrypointers()
 
-        for node in [k for k in node2nodes.keys()]:
-            # check if the entry still exists
-            if not node in node2nodes.keys():
-                continue
-            # remove the entry of each reachable node
-            for rnode in node2nodes[node]:
-                if rnode == node:
-                    continue
-                node2nodes.pop(rnode, None)
+    def _detectedEntrypointers(self) -> List[Dict[str, str]]:
+        '''
+        Returns the entry points detected by function `detect_entrypointers`.
+        A node reached by no other node except the nodes it reaches itself
+        belongs to a source component of the condensation of the graph, see
+        function `stronglyConnectedComponents`. The first node of each source
+        component in the order of the vertices is an entry pointer.
+        '''
+        components = self.stronglyConnectedComponents()
+        node2component = {
+            node: pos
+            for pos, component in enumerate(components)
+            for node in component
+        }
+        sources = set(range(len(components)))
+        for node, pos in node2component.items():
+            for rnode in self.successors(node):
+                if node2component[rnode] != pos:
+                    sources.discard(node2component[rnode])
+
+        roots = []
+        for node in self.vertexIds():
+            pos = node2component[node]
+            if pos in sources:
+                sources.remove(pos)
+                roots.append(node)
 
         # recreate the entrypoints
         entrypoints = []
-        for pos, key in enumerate(node2nodes.keys()):
-            ep = [v for v in self.vertices() if v["id"] == key][0]
+        for pos, key in enumerate(roots):
+            ep = self.vertex(key)
             ep_dct = {
                 "name": f"ep{pos}",
                 "target": ep["id"],
                 "type": ep["struct"]
             }
             entrypoints.append(ep_dct)
+        return entrypoints
 
-        # update the entry points of the memory graph
-        self.json["entrypoints"] = entrypoints
+    def stronglyConnectedComponents(self) -> List[List[str]]:
+        '''
+        Returns the strongly connected components of the memory graph, each as
+        a list of node IDs, in reverse topological order of the condensation,
+        i.e., a component is listed before each component reaching it. The
+        components are computed in linear time using an iterative version of
+        Tarjan's algorithm over the non `NULL` targets of all fields.
+        '''
+        index = {}
+        lowlink = {}
+        stack = []
+        onStack = set()
+        components = []
+        for root in self.vertexIds():
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            onStack.add(root)
+            work = [(root, iter(self.successors(root)))]
+            while work:
+                node, rnodes = work[-1]
+                for rnode in rnodes:
+                    if rnode not in index:
+                        index[rnode] = lowlink[rnode] = len(index)
+                        stack.append(rnode)
+                        onStack.add(rnode)
+                        work.append((rnode, iter(self.successors(rnode))))
+                        break
+                    if rnode in onStack:
+                        lowlink[node] = min(lowlink[node], index[rnode])
+                else:
+                    # all successors of the node have been visited
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            rnode = stack.pop()
+                            onStack.remove(rnode)
+                            component.append(rnode)
+                            if rnode == node:
+                                break
+                        components.append(component)
+        return components
 
     def reachableNodes(self, node: str, fields: str = None) -> List[str]:
         """
@@ -173,29 +596,22 @@ class MemoryGraph(object):
         detects and handles cycles in graphs accordingly. The optional parameter
         `fields` contains a list of field names that shall be considered during
         the reachability analysis. By default, i.e., `fields` is `None`, all
-        fields are considered.
+        fields are considered. Each node is visited once using the index of the
+        memory graph, see function `index`.
         """
         lst = []
+        visited = set()
         stack = [node]
         while stack:
             top = stack.pop()
-            topNode = [v for v in self.vertices() if v["id"] == top][0]
-            if fields is None:
-                rnodes = [a["value"] for a in topNode["assignment"]]
-            else:
-                rnodes = [
-                    a["value"]
-                    for a in topNode["assignment"]
-                    if a["name"] in fields
-                ]
-            for rnode in rnodes:
-                if rnode == "NULL":
-                    # ignore NULL values
-                    continue
-                if rnode in lst:
-                    # we have already visited this node
-                    continue
-                stack.append(rnode)
+            if top in visited:
+                # we have already visited this node
+                continue
+            visited.add(top)
+            stack.extend(
+                rnode for rnode in self.successors(top, fields)
+                if rnode not in visited
+            )
             lst.append(top)
         return lst
 
@@ -204,10 +620,10 @@ class MemoryGraph(object):
         Synthesizes C code that resembles a C struct definition.
         '''
         chunks = []
-        for struct in self.structs():
-            name = struct['name']
+        for struct_ in self.structs():
+            name = struct_['name']
             chunks.append(f'struct {name} {{')
-            for field in struct['fields']:
+            for field in struct_['fields']:
                 ttype = field['type']
                 tname = field['name']
                 chunks.append(f'struct {ttype}* {tname};')
@@ -218,23 +634,121 @@ class MemoryGraph(object):
         '''
         Returns the struct name of a vertex given its ID.
         '''
-        vertices = [v for v in self.vertices() if v['id'].capitalize() == id]
+        self.index()
+        vertices = self._capitalizedId2vertices.get(id, [])
         assert len(vertices) == 1
         vertex = vertices[0]
         return vertex["struct"]
 
+    def canonicalHash(self) -> str:
+        '''
+        Returns a hash of the canonical form of the memory graph, see function
+        `canonicalForm`, which is equal for memory graphs that only differ in
+        the IDs of their nodes. Hence, it serves to drop duplicate memory
+        graphs and as a key to memoise results computed for a memory graph.
+        The hash is cached like the node abstractions, see function
+        `vertexAbstractions`.
+        '''
+        key = self._abstractionsKeyParts()
+        if self._canonicalHashKey is None or not all(
+            a is b for a, b in zip(key, self._canonicalHashKey)
+        ):
+            form = canonicalForm(
+                self.vertices(), self.entrypoints(), self.structs())
+            self._canonicalHash = hashlib.sha256(
+                repr(form).encode('utf-8')).hexdigest()
+            self._canonicalHashKey = key
+        return self._canonicalHash
+
+    def _abstractionsKeyParts(self) -> tuple:
+        '''
+        Returns the parts of the memory graph the node abstractions depend on,
+        see function `vertexAbstractions`.
+        '''
+        return (self.json['vertices'], self.json['entrypoints'], self.json['structs'])
+
+    def _fieldTargets(self, fields: List[str]):
+        '''
+        Returns the IDs of the vertices, the targets of the given fields of
+        each vertex as a matrix and the ID of each vertex, where IDs are
+        encoded by the position of the first vertex with the ID, see function
+        `encodeVertexAbstractions`.
+        '''
+        ids = self.vertexIds()
+        id2pos = {}
+        for pos, id in enumerate(ids):
+            id2pos.setdefault(id, pos)
+        id2pos[constants.NULL_UPPER] = -1
+        targets = []
+        for vertex in self.vertices():
+            assignment = {a['name']: a['value'] for a in vertex['assignment']}
+            # targets without a vertex are encoded after the vertices
+            targets.append([
+                id2pos.setdefault(assignment[field], len(ids) + len(id2pos))
+                for field in fields
+            ])
+        targets = numpy.array(targets, dtype=numpy.int64).reshape(
+            len(ids), len(fields))
+        this = numpy.array([id2pos[id] for id in ids], dtype=numpy.int64)
+        return ids, targets, this
+
+    def vertexAbstractions(self) -> Dict:
+        '''
+        Computes the node abstraction of each vertex in a single vectorised
+        pass, see function `encodeVertexAbstractions`, and caches the result
+        until the vertices, entry points or structs of the JSON representation
+        are replaced or function `invalidateIndex` is called. The result
+        comprises the distinct abstractions, the position of the abstraction of
+        each vertex among them (`inverse`), whether a vertex is an entry node
+        (`entry`) and the position of the abstraction of each entry pointer
+        (`entrypoints`).
+        '''
+        key = self._abstractionsKeyParts()
+        if self._abstractionsKey is not None and all(
+            a is b for a, b in zip(key, self._abstractionsKey)
+        ):
+            return self._abstractions
+        fields = self.fields()
+        ids, targets, this = self._fieldTargets(fields)
+        if ids:
+            unique, inverse = numpy.unique(
+                encodeVertexAbstractions(targets, this),
+                axis=0,
+                return_inverse=True
+            )
+        else:
+            unique, inverse = numpy.empty((0, len(fields))), numpy.empty(0)
+        targetsEP = {ep['target'] for ep in self.entrypoints()}
+        id2pos = {}
+        for pos, id in enumerate(ids):
+            if id in targetsEP:
+                id2pos[id] = pos
+        inverse = inverse.reshape(-1).astype(numpy.int64)
+        self._abstractions = {
+            'abstractions': [
+                decodeVertexAbstraction(row, fields) for row in unique.tolist()
+            ],
+            'inverse': inverse,
+            'entry': numpy.array([id in targetsEP for id in ids], dtype=bool),
+            'entrypoints': {
+                ep['name']: int(inverse[id2pos[ep['target']]])
+                for ep in self.entrypoints()
+            }
+        }
+        self._abstractionsKey = key
+        return self._abstractions
+
     def vertexAbstractionEPs(self) -> List[Dict[str, str]]:
         '''
         Computes a dictionary mapping entry pointer names to their nodes vertex
-        abstraction. This is internally performed using function
-        `vertexAbstraction`. 
+        abstraction. This is internally performed using the cached abstractions
+        of function `vertexAbstractions`.
         '''
-        abstractions = {}
-        for ep in self.entrypoints():
-            vertex = [v for v in self.vertices() if ep["target"] == v["id"]][0]
-            abstraction = vertexAbstraction([vertex], self.fields())
-            abstractions[ep["name"]] = abstraction
-        return abstractions
+        cached = self.vertexAbstractions()
+        return {
+            name: [dict(cached['abstractions'][pos])]
+            for name, pos in cached['entrypoints'].items()
+        }
 
     def vertexAbstractionEP(self) -> List[Dict[str, str]]:
         '''
@@ -243,17 +757,36 @@ class MemoryGraph(object):
         '''
         return self.vertexAbstractionEPs()[self.entrypoint()["name"]]
 
-    def vertexAbstractionOthers(self) -> List[Dict[str, str]]:
+    def vertexAbstractionOthers(self, deduplicate: bool = True) -> List[Dict[str, str]]:
         '''
-        Computes a node abstraction for non entry nodes using
-        `vertexAbstraction`. 
+        Computes a node abstraction for non entry nodes using the cached
+        abstractions of function `vertexAbstractions`. Duplicate abstractions
+        are dropped, unless `deduplicate` is `False`, in which case the
+        abstraction of each non entry node is returned in the order of the
+        vertices.
         '''
-        entrypoints = [v["target"] for v in self.entrypoints()]
-        vertices = [
-            v for v in self.json['vertices']
-            if v['id'] not in entrypoints
+        cached = self.vertexAbstractions()
+        inverse = cached['inverse'][~cached['entry']]
+        if deduplicate:
+            inverse = numpy.unique(inverse)
+        return [dict(cached['abstractions'][i]) for i in inverse.tolist()]
+
+    def vertexAbstractionCounts(self) -> List[Tuple[Dict[str, str], int]]:
+        '''
+        Returns each distinct node abstraction of the non entry nodes together
+        with the number of non entry nodes it abstracts, see function
+        `vertexAbstractions`.
+        '''
+        cached = self.vertexAbstractions()
+        counts = numpy.bincount(
+            cached['inverse'][~cached['entry']],
+            minlength=len(cached['abstractions'])
+        )
+        return [
+            (dict(abstraction), count)
+            for abstraction, count in zip(cached['abstractions'], counts.tolist())
+            if count
         ]
-        return vertexAbstraction(vertices, self.fields())
 
     def synthPrologFacts(self) -> List[str]:
         data = self.json
@@ -374,6 +907,20 @@ class MemoryGraph(object):
             assert False
         return memoryGraph
 
+    def compact(self) -> 'CompactMemoryGraph':
+        '''
+        Returns the memory graph in the array-backed representation of class
+        `CompactMemoryGraph`.
+        '''
+        return CompactMemoryGraph.fromMemoryGraph(self)
+
+    def toMemoryGraph(self) -> 'MemoryGraph':
+        '''
+        Returns the memory graph as an instance of class `MemoryGraph`, whose
+        JSON representation can be patched, see class `CompactMemoryGraph`.
+        '''
+        return self
+
     @staticmethod
     def fromFile(filename: str):
         if filename.endswith(".json"):
@@ -382,6 +929,10 @@ class MemoryGraph(object):
             return MemoryGraph.fromPLFile(filename)
         elif filename.endswith(".dot"):
             return MemoryGraph.fromDOTFile(filename)
+        elif filename.endswith(".mgb"):
+            # the compact representation cannot be patched, callers patching
+            # the JSON representation convert it using function `toMemoryGraph`
+            return CompactMemoryGraph.fromBinaryFile(filename)
         else:
             raise Exception("Unknown file ending.")
 
@@ -414,7 +965,10 @@ class MemoryGraph(object):
         Creates a new `MemoryGraph` object given the path to a PL file. The
         Prolog code is assumed to comply with the following notation:
 
-        - empty and commented out lines are allowed, but dropped during parsing
+        - empty lines and comments, which start with `%` and run until the end
+          of the line, are allowed, but dropped during parsing
+        - a clause may span multiple lines and a line may contain multiple
+          clauses
         - the `node` predicate encodes vertices, e.g., `node(n1)` encodes a
           vertex with name `n1`
         - the `entrypoint` predicate denotes entrypoints of the memory graph,
@@ -442,66 +996,80 @@ class MemoryGraph(object):
         but required by the JSON format used to encode a memory graph. Hence,
         type information is reverse engineered assuming that same fields belong
         to the same struct and different fields belong to different structs.
+
+        The file is streamed line by line and the vertices are indexed by their
+        ID while parsing, such that the translation takes linear time in the
+        number of facts. A `ShaPEexception` is raised as soon as a line
+        contains text that does not begin a fact, stating the line number.
         '''
         helper.logger().debug(f"Translating the Prolog file {filename} ...")
-        facts = None
-        with open(filename, 'r') as f:
-            facts = f.read().splitlines()
-
+        pattern = re.compile(r'\s*(\w+)\(\s*(\w+)\s*(?:,\s*(\w+)\s*)?\)\s*\.')
         vertices = []
+        id2vertex = {}
         entrypoints = []
-        structs = []
 
-        # drop empty lines
-        facts = list(filter(lambda f: f, facts))
+        # the beginning of a fact spanning multiple lines
+        prefix = re.compile(
+            r'\s*(?:\w+\s*(?:\(\s*(?:\w+\s*(?:,\s*(?:\w+\s*)?)?(?:\)\s*)?)?)?)?'
+        )
 
-        # drop comments
-        facts = list(filter(lambda f: not f.startswith('%'), facts))
+        def facts():
+            # stream the facts, the text of a fact spanning multiple lines is
+            # kept until the fact is complete
+            pending = ''
+            with open(filename, 'r') as f:
+                for lineno, line in enumerate(f, 1):
+                    # drop comments
+                    pending += line.split('%', 1)[0]
+                    pos = 0
+                    match = pattern.match(pending, pos)
+                    while match:
+                        yield [x for x in match.groups() if x]
+                        pos = match.end()
+                        match = pattern.match(pending, pos)
+                    pending = pending[pos:]
+                    if not prefix.fullmatch(pending):
+                        raise helper.ShaPEexception(
+                            f'cannot parse "{pending.strip()}" in line {lineno} '
+                            f'of {filename}')
+            if pending.strip():
+                raise helper.ShaPEexception(
+                    f'cannot parse "{pending.strip()}" at the end of {filename}')
 
-        entrypointsCtr = 0
-
-        for f in facts:
-            fact = re.search(r'(\w+)\((\w+)(?:, (\w+))*\).', f).groups()
-            fact = list(filter(lambda f: f, fact))
+        # index the vertices by their ID on the way
+        for fact in facts():
             if fact[0] == 'node':
-                vertices.append({'id': fact[1], 'assignment': []})
+                vertex = {'id': fact[1], 'assignment': []}
+                vertices.append(vertex)
+                id2vertex.setdefault(fact[1], vertex)
             elif fact[0] == 'entrypoint':
                 entrypoints.append(
-                    {'name': 'ep%s' % entrypointsCtr, 'target': fact[1]})
-                entrypointsCtr += 1
+                    {'name': 'ep%s' % len(entrypoints), 'target': fact[1]})
             else:
                 field = fact[0]
                 src = fact[1]
                 dst = fact[2]
                 if dst == 'null':
                     dst = 'NULL'
-                vertex = [v for v in vertices if v['id'] == src][0]
-                vertex['assignment'].append({'name': field, 'value': dst})
+                id2vertex[src]['assignment'].append(
+                    {'name': field, 'value': dst})
 
-        # resynth type information
-        fields2nodes = {}
-        for v in vertices:
-            fields = list(map(lambda a: a['name'], v['assignment']))
-            fields.sort()
-            if str(fields) not in fields2nodes.keys():
-                fields2nodes[str(fields)] = []
-            fields2nodes[str(fields)].append(v['id'])
-        helper.logger().debug(f"fields2nodes: {fields2nodes}")
-
-        structCtr = 0
+        # resynth type information, nodes with the same fields share a struct
         fields2struct = {}
         vertexid2struct = {}
+        for v in vertices:
+            fields = str(sorted(a['name'] for a in v['assignment']))
+            if fields not in fields2struct:
+                fields2struct[fields] = 'struct%s' % len(fields2struct)
+            vertexid2struct[v['id']] = fields2struct[fields]
+        helper.logger().debug(
+            f"Reconstructed {len(fields2struct)} structs for "
+            f"{len(vertexid2struct)} nodes")
 
-        for _, nodes in fields2nodes.items():
-            struct = 'struct%s' % structCtr
-            fields2struct[struct] = nodes
-            structCtr += 1
-            for n in nodes:
-                vertexid2struct[n] = struct
-        helper.logger().debug(f"vertexid2struct: {vertexid2struct}")
-
+        struct2fields = {}
         for v in vertices:
             v['struct'] = vertexid2struct[v['id']]
+            fields = struct2fields.setdefault(v['struct'], {})
             for a in v['assignment']:
                 # edge case: when a single node points to NULL, we cannot
                 # resynth the type it points to. In such a situation, we assume
@@ -509,41 +1077,23 @@ class MemoryGraph(object):
                 if a['value'] != 'NULL':
                     a['type'] = vertexid2struct[a['value']]
                 else:
-                    a['type'] = vertexid2struct[v['id']]
-
-        for structname in sorted(list(set(vertexid2struct.values()))):
-            typeVerticeIDs = [x for x in vertexid2struct.keys(
-            ) if vertexid2struct[x] == structname]
-            typeVertices = [x for x in vertices if x['id'] in typeVerticeIDs]
-            fields = []
-            for tv in typeVertices:
-                ass = tv['assignment']
-                for a in ass:
-                    if not 'type' in a:
-                        continue
-                    vertexfield = {'type': a['type'], 'name': a['name']}
-                    if not vertexfield in fields:
-                        fields.append(vertexfield)
-            struct = {'name': structname, 'fields': fields}
-            structs.append(struct)
+                    a['type'] = v['struct']
+                fields.setdefault((a['type'], a['name']))
+
+        structs = [
+            {
+                'name': structname,
+                'fields': [
+                    {'type': ttype, 'name': name}
+                    for ttype, name in struct2fields[structname]
+                ]
+            }
+            for structname in sorted(struct2fields)
+        ]
 
         for ep in entrypoints:
             ep['type'] = vertexid2struct[ep['target']]
 
-        for v in vertices:
-            for a in v['assignment']:
-                if not 'type' in a.keys():
-                    struct = [
-                        s for s in structs
-                        if s['name'] == v['struct']
-                    ][0]
-                    xxx = [
-                        x['type'] for x in struct['fields']
-                        if x['name'] == a['name']]
-                    if xxx:
-                        xxx = xxx[0]
-                        a['type'] = xxx
-
         memoryGraph = MemoryGraph()
         memoryGraph.json = {
             'structs': structs,
@@ -552,3 +1102,405 @@ class MemoryGraph(object):
         }
 
         return memoryGraph
+
+
+class ReadOnlyJSON(dict):
+    '''
+    Representation of a `CompactMemoryGraph` in JSON format, which rejects
+    modifications since they would not be reflected in the compact
+    representation. Copies are plain dictionaries that can be modified.
+    '''
+
+    def _readOnly(self, *args, **kwargs):
+        raise TypeError(
+            'the JSON representation of a CompactMemoryGraph is read-only, '
+            'patch the MemoryGraph returned by function toMemoryGraph instead')
+
+    __setitem__ = _readOnly
+    __delitem__ = _readOnly
+    clear = _readOnly
+    pop = _readOnly
+    popitem = _readOnly
+    setdefault = _readOnly
+    update = _readOnly
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class CompactMemoryGraph(MemoryGraph):
+    '''
+    Array-backed representation of a memory graph for snapshots with millions
+    of vertices, which provides the same functions as class `MemoryGraph`. The
+    IDs of vertices are interned and numbered by their position, and the fields
+    are numbered by a field table. The targets of the fields are stored in a
+    NumPy matrix with one row per vertex and one column per field, where `-1`
+    encodes `NULL` and `-2` encodes that the vertex has no such field. The
+    types of the assignments are stored in a second matrix encoding types by
+    their position in a type table.
+
+    The vertices in JSON format are materialized on demand, e.g., by functions
+    `vertices` and `json`. Hence, modifications of the materialized vertices
+    are not reflected in the compact representation and assignments to the
+    sections of the JSON representation raise a `TypeError`, see class
+    `ReadOnlyJSON`. Compact memory graphs are converted using functions
+    `fromMemoryGraph` and `toMemoryGraph` and are patched by converting them
+    back and forth.
+    '''
+
+    NULL = -1
+    '''
+    Encodes a `NULL` target in the successor matrix.
+    '''
+    ABSENT = -2
+    '''
+    Encodes a missing field in the successor matrix.
+    '''
+    BINARY_MAGIC = b'SHAPEMG1'
+    '''
+    Magic number and version at the beginning of a binary memory graph file,
+    see function `toBinaryFile`.
+    '''
+    BINARY_HEADER = struct.Struct('<8s6Q')
+
+    @property
+    def json(self) -> Dict:
+        '''
+        Representation of the memory graph in JSON format, which is
+        materialized on each access and is read-only, see class
+        `ReadOnlyJSON`.
+        '''
+        return ReadOnlyJSON(
+            structs=self._structs,
+            vertices=self.vertices(),
+            entrypoints=self._entrypoints
+        )
+
+    @json.setter
+    def json(self, content: Dict) -> None:
+        if content is None:
+            # the initial value set by the constructor of `MemoryGraph`
+            content = {'structs': [], 'vertices': [], 'entrypoints': []}
+        self._structs = content['structs']
+        self._entrypoints = content['entrypoints']
+        self._vertices = None
+        '''
+        The vertices in JSON format once materialized, see function
+        `vertices`.
+        '''
+        self._columns = {}
+        '''
+        The columns of the successor matrix for each selection of fields, see
+        function `_fieldColumns`.
+        '''
+        self._capitalizedId2pos = None
+
+        vertices = content['vertices']
+        self._ids = [sys.intern(v['id']) for v in vertices]
+        self._id2pos = {id: pos for pos, id in enumerate(self._ids)}
+        self._fieldNames = []
+        field2column = {}
+        self._typeNames = []
+        type2code = {}
+
+        def typeCode(name: str) -> int:
+            if name not in type2code:
+                type2code[name] = len(self._typeNames)
+                self._typeNames.append(name)
+            return type2code[name]
+
+        rows = []
+        for vertex in vertices:
+            row = {}
+            for a in vertex['assignment']:
+                if a['name'] not in field2column:
+                    field2column[a['name']] = len(self._fieldNames)
+                    self._fieldNames.append(a['name'])
+                if a['value'] == constants.NULL_UPPER:
+                    target = self.NULL
+                else:
+                    # targets without a vertex are interned after the vertices
+                    target = self._id2pos.setdefault(
+                        a['value'], len(self._ids))
+                    if target == len(self._ids):
+                        self._ids.append(sys.intern(a['value']))
+                row[field2column[a['name']]] = (
+                    target, typeCode(a['type']) if 'type' in a else -1
+                )
+            rows.append((typeCode(vertex['struct']), row))
+
+        shape = (len(vertices), len(self._fieldNames))
+        self._targets = numpy.full(shape, self.ABSENT, dtype=numpy.int32)
+        self._types = numpy.full(shape, -1, dtype=numpy.int32)
+        self._structCodes = numpy.array(
+            [code for code, _ in rows], dtype=numpy.int32)
+        for pos, (_, row) in enumerate(rows):
+            for column, (target, code) in row.items():
+                self._targets[pos, column] = target
+                self._types[pos, column] = code
+
+    def index(self) -> None:
+        '''
+        The compact representation is its own index.
+        '''
+        pass
+
+    def invalidateIndex(self) -> None:
+        pass
+
+    def _vertexJSON(self, pos: int) -> Dict[str, Union[str, List[Dict[str, str]]]]:
+        '''
+        Materializes the vertex at the given position in JSON format.
+        '''
+        assignment = []
+        for column, target in enumerate(self._targets[pos].tolist()):
+            if target == self.ABSENT:
+                continue
+            a = {
+                'name': self._fieldNames[column],
+                'value': constants.NULL_UPPER if target == self.NULL
+                else self._ids[target]
+            }
+            code = int(self._types[pos, column])
+            if code != -1:
+                a['type'] = self._typeNames[code]
+            assignment.append(a)
+        return {
+            'id': self._ids[pos],
+            'assignment': assignment,
+            'struct': self._typeNames[self._structCodes[pos]]
+        }
+
+    def _fieldColumns(self, fields: List[str] = None) -> List[int]:
+        '''
+        Returns the columns of the successor matrix of the given fields, or of
+        all fields if `fields` is `None`, which are computed once per
+        selection of fields.
+        '''
+        key = fields if fields is None or isinstance(fields, str) \
+            else tuple(fields)
+        if key not in self._columns:
+            self._columns[key] = [
+                column for column, name in enumerate(self._fieldNames)
+                if fields is None or name in fields
+            ]
+        return self._columns[key]
+
+    def vertex(self, id: str) -> Dict[str, Union[str, List[Dict[str, str]]]]:
+        if self._vertices is not None:
+            return self._vertices[self._id2pos[id]]
+        return self._vertexJSON(self._id2pos[id])
+
+    def successors(self, id: str, fields: List[str] = None) -> List[str]:
+        pos = self._id2pos[id]
+        if fields is None:
+            targets = self._targets[pos].tolist()
+        else:
+            targets = self._targets[pos, self._fieldColumns(fields)].tolist()
+        return [self._ids[target] for target in targets if target >= 0]
+
+    def vertices(self) -> List[Dict[str, Union[str, List[Dict[str, str]]]]]:
+        '''
+        Returns the vertices in JSON format, which are materialized on the
+        first call and must not be modified.
+        '''
+        if self._vertices is None:
+            self._vertices = [
+                self._vertexJSON(pos) for pos in range(len(self._structCodes))
+            ]
+        return self._vertices
+
+    def vertexIds(self) -> List[str]:
+        return self._ids[:len(self._structCodes)]
+
+    def structs(self) -> List[Dict[str, Union[str, List[Dict[str, str]]]]]:
+        return self._structs
+
+    def entrypoints(self) -> List[Dict[str, str]]:
+        return self._entrypoints
+
+    def detect_entrypointers(self):
+        self._entrypoints = self._detectedEntrypointers()
+
+    def reachableNodes(self, node: str, fields: str = None) -> List[str]:
+        columns = None if fields is None else self._fieldColumns(fields)
+        lst = []
+        visited = numpy.zeros(len(self._ids), dtype=bool)
+        stack = [self._id2pos[node]]
+        while stack:
+            top = stack.pop()
+            if visited[top]:
+                continue
+            visited[top] = True
+            if top >= len(self._structCodes):
+                raise KeyError(self._ids[top])
+            targets = self._targets[top] if columns is None \
+                else self._targets[top, columns]
+            stack.extend(
+                target for target in targets.tolist()
+                if target >= 0 and not visited[target]
+            )
+            lst.append(self._ids[top])
+        return lst
+
+    def structOfVertex(self, id: str) -> Dict[str, Union[str, List[Dict[str, str]]]]:
+        if self._capitalizedId2pos is None:
+            self._capitalizedId2pos = {}
+            for pos, vid in enumerate(self._ids[:len(self._structCodes)]):
+                self._capitalizedId2pos.setdefault(
+                    vid.capitalize(), []).append(pos)
+        positions = self._capitalizedId2pos.get(id, [])
+        assert len(positions) == 1
+        return self._typeNames[self._structCodes[positions[0]]]
+
+    def _abstractionsKeyParts(self) -> tuple:
+        return (self._entrypoints, self._structs)
+
+    def _fieldTargets(self, fields: List[str]):
+        columns = [self._fieldNames.index(f) for f in fields]
+        nVertices = len(self._structCodes)
+        return (
+            self.vertexIds(),
+            self._targets[:, columns],
+            numpy.arange(nVertices, dtype=self._targets.dtype)
+        )
+
+    def synthPrologFacts(self) -> List[str]:
+        clauses = []
+        for pos in range(len(self._structCodes)):
+            id = self._ids[pos]
+            clauses.append(f'node({id}).')
+            for column, target in enumerate(self._targets[pos].tolist()):
+                if target == self.ABSENT:
+                    continue
+                target = constants.NULL_LOWER if target == self.NULL \
+                    else self._ids[target]
+                clauses.append(f'{self._fieldNames[column]}({id}, {target}).')
+        return clauses
+
+    def compact(self) -> 'CompactMemoryGraph':
+        return self
+
+    def toMemoryGraph(self) -> MemoryGraph:
+        '''
+        Converts the compact memory graph into an instance of class
+        `MemoryGraph`, which can be patched independently of the compact
+        memory graph.
+        '''
+        return MemoryGraph.fromJSON({
+            'structs': copy.deepcopy(self._structs),
+            'vertices': self.vertices(),
+            'entrypoints': copy.deepcopy(self._entrypoints)
+        })
+
+    @staticmethod
+    def fromMemoryGraph(memoryGraph: MemoryGraph) -> 'CompactMemoryGraph':
+        '''
+        Creates a new `CompactMemoryGraph` object from a `MemoryGraph`.
+        '''
+        compactMemoryGraph = CompactMemoryGraph()
+        compactMemoryGraph.json = memoryGraph.json
+        return compactMemoryGraph
+
+    @staticmethod
+    def fromJSON(content: str) -> 'CompactMemoryGraph':
+        '''
+        Creates a new `CompactMemoryGraph` object from a JSON string or
+        dictionary, see function `MemoryGraph.fromJSON`.
+        '''
+        return CompactMemoryGraph.fromMemoryGraph(MemoryGraph.fromJSON(content))
+
+    def toBinaryFile(self, filename: str) -> None:
+        '''
+        Writes the memory graph to a binary file, which is loaded without
+        parsing using function `fromBinaryFile`. All numbers are stored in
+        little endian byte order and each section starts at a multiple of 8
+        bytes:
+
+        1. the header `BINARY_HEADER` comprising the magic number
+           `BINARY_MAGIC`, the number of vertices, fields, IDs and types, and
+           the size of the string table and the metadata in bytes
+        2. the successor matrix and the type matrix as `int32` arrays with one
+           row per vertex and one column per field
+        3. the struct of each vertex as an `int32` array
+        4. the offsets of the strings in the decoded string table as an
+           `int64` array, where the string table lists the IDs, the fields and
+           the types
+        5. the string table in UTF-8
+        6. the structs and entry points in JSON format as metadata
+        '''
+        strings = self._ids + self._fieldNames + self._typeNames
+        offsets = numpy.cumsum(
+            [0] + [len(string) for string in strings], dtype='<i8')
+        text = ''.join(strings).encode('utf-8')
+        metadata = json.dumps({
+            'structs': self._structs,
+            'entrypoints': self._entrypoints
+        }).encode('utf-8')
+        sections = [
+            self._targets.astype('<i4').tobytes(),
+            self._types.astype('<i4').tobytes(),
+            self._structCodes.astype('<i4').tobytes(),
+            offsets.tobytes(),
+            text,
+            metadata
+        ]
+        with open(filename, 'wb') as f:
+            f.write(self.BINARY_HEADER.pack(
+                self.BINARY_MAGIC, len(self._structCodes),
+                len(self._fieldNames), len(self._ids), len(self._typeNames),
+                len(text), len(metadata)
+            ))
+            for section in sections:
+                f.write(section)
+                f.write(bytes(-len(section) % 8))
+
+    @staticmethod
+    def fromBinaryFile(filename: str) -> 'CompactMemoryGraph':
+        '''
+        Creates a new `CompactMemoryGraph` object given the path to a binary
+        file written by function `toBinaryFile`. The file is memory-mapped and
+        the successor matrix, the type matrix and the structs of the vertices
+        are read-only NumPy views of the mapped file.
+        '''
+        with open(filename, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = CompactMemoryGraph.BINARY_HEADER
+        magic, nVertices, nFields, nIds, nTypes, textSize, metadataSize = \
+            header.unpack_from(buffer)
+        if magic != CompactMemoryGraph.BINARY_MAGIC:
+            raise helper.ShaPEexception(
+                f'{filename} is not a binary memory graph file')
+
+        offset = header.size
+
+        def section(dtype: str, count: int) -> numpy.ndarray:
+            nonlocal offset
+            array = numpy.frombuffer(
+                buffer, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes + (-array.nbytes % 8)
+            return array
+
+        compactMemoryGraph = CompactMemoryGraph()
+        compactMemoryGraph._targets = section(
+            '<i4', nVertices * nFields).reshape(nVertices, nFields)
+        compactMemoryGraph._types = section(
+            '<i4', nVertices * nFields).reshape(nVertices, nFields)
+        compactMemoryGraph._structCodes = section('<i4', nVertices)
+        offsets = section('<i8', nIds + nFields + nTypes + 1).tolist()
+        text = buffer[offset:offset + textSize].decode('utf-8')
+        offset += textSize + (-textSize % 8)
+        metadata = json.loads(buffer[offset:offset + metadataSize])
+
+        strings = [
+            text[start:end] for start, end in zip(offsets, offsets[1:])
+        ]
+        compactMemoryGraph._ids = [sys.intern(id) for id in strings[:nIds]]
+        compactMemoryGraph._id2pos = {
+            id: pos for pos, id in enumerate(compactMemoryGraph._ids)
+        }
+        compactMemoryGraph._fieldNames = strings[nIds:nIds + nFields]
+        compactMemoryGraph._typeNames = strings[nIds + nFields:]
+        compactMemoryGraph._structs = metadata['structs']
+        compactMemoryGraph._entrypoints = metadata['entrypoints']
+        return compactMemoryGraph
@@ -4,8 +4,14 @@ Provides functions to prune a list of candidate rules, i.e., `pruneRules`, and
 optimize the ordering of rules, i.e., `optimizeOrderOfRules`.
 '''
 
+import itertools
+import math
+import multiprocessing
 import re
-from typing import Dict, List
+import time
+from typing import Dict, List, Tuple
+
+import numpy
 
 from . import constants
 from .model import MemoryGraph
@@ -14,7 +20,12 @@ from . import constants
 from . import helper
 
 
-def optimizeOrderOfRules(rules: List[str], comparators=None) -> List[str]:
+def optimizeOrderOfRules(
+        rules: List[str],
+        comparators=None,
+        model: Dict = None,
+        frequencies: Dict = None
+) -> List[str]:
     '''
     Optimizes the ordering of the provided rules by moving more-likely rules to
     the beginning and less-likely rules to the end. This shall increase the
@@ -22,173 +33,347 @@ def optimizeOrderOfRules(rules: List[str], comparators=None) -> List[str]:
     tested sequentially, i.e., traversing the list from head to tail. Adjusting
     the order of rules can therefore be seen as a form of controlling the
     search. Besides, the ordering also improves readability of the rules for humans.
+
+    The key of each rule is computed once using function `multiHeuristicsKey`.
+    If the vertex abstraction frequencies of the memory graphs, see function
+    `abstractionFrequencies`, are provided, the rules are primarily ordered by
+    the number of vertices they match, see function `comparator_frequency`. If
+    a rule ordering model, see function `trainOrderingModel`, is provided, the
+    rules are then ordered by their score, see function `comparator_model`. In
+    both cases, the comparators only break ties.
     '''
 
     if comparators is None:
         comparators = constants.COMPARATORS_DEFAULT
 
     import functools
+    primary = []
+    if frequencies is not None:
+        primary.append(
+            (functools.partial(comparator_frequency, frequencies=frequencies), 1)
+        )
+    if model is not None:
+        validateOrderingModel(model)
+        primary.append(
+            (functools.partial(comparator_model, model=model), 1)
+        )
+    if primary:
+        comparators = [(comparator_pname, 1)] + primary + list(comparators)
+
     return sorted(
         rules,
-        key=functools.cmp_to_key(
-            functools.partial(
-                multiHeuristicsComparator,
-                comparators=comparators
-            )
+        key=functools.partial(
+            multiHeuristicsKey,
+            comparators=comparators
         )
     )
 
 
-def multiHeuristicsComparator(rule1: str, rule2: str, comparators) -> int:
+def multiHeuristicsKey(rule: str, comparators) -> Tuple:
     '''
     Heuristics in the form of rule comparators are used to decide whether a rule
     is assumed to be more/less-likely compared to another rule. This function
-    consults the provided comparators one after the other until a comparator
-    yields `-1` (rule1 is more likely) or `+1` (rule2 is more likely) as a
-    result. If all comparator consider the two rules to be equally likely then a
-    deterministic choice is performed, i.e., rule1 is considered to be
-    more-likely.
+    computes a key of a rule from the provided comparators, such that a rule
+    with a smaller key is considered more-likely. Keys are compared
+    lexicographically, i.e., the comparators are consulted one after the other
+    until two rules differ. If all comparators consider the two rules to be
+    equally likely then their original order is kept.
 
     The `comparators` parameter contains a List of tuples. The first tuple
     element contains the comparator function, which follows the typed function
-    header: `def cmp(r1: str, r2: str) -> int`. The second tuple element
-    contains a modifier of type int, which is multiplied with the result of the
-    comparator. Hence, a value of `1` keeps the original comparator return value
-    whereas a value of `-1` negates the value.
+    header: `def cmp(r: str) -> int` and yields a feature of the rule, where
+    smaller features are more-likely. The second tuple element contains a
+    modifier of type int, which is multiplied with the feature. Hence, a value
+    of `1` keeps the original order whereas a value of `-1` reverses it.
     '''
-    for comparator, modification in comparators:
-        decision = modification * comparator(rule1, rule2)
-        if decision:
-            return decision
-
-    # perform any deterministic choice here
-    return -1
+    return tuple(
+        modification * comparator(rule)
+        for comparator, modification in comparators
+    )
 
 
-def comparator_pname(rule1: str, rule2: str) -> int:
+def comparator_pname(rule: str) -> int:
     '''
     Entry rules are considered more-likely than non-entry, i.e., `p`, rules.
 
-    For example, rule1 `p(This) :- ...` is considered more-likely when compared
-    to rule2 `entry(This) :- ...` in which case the comparator yields `-1` as
-    output.
+    For example, the rule `entry(This) :- ...` yields `0` and the rule `p(This)
+    :- ...` yields `1` as output.
     '''
-    head1, _ = rule1.split(constants.DELIMITER_RULE)
-    head2, _ = rule2.split(constants.DELIMITER_RULE)
-    if head1.startswith("entry(") and not head2.startswith("entry("):
-        return -1
-    elif not head1.startswith("entry(") and head2.startswith("entry("):
-        return 1
-    else:
-        return 0
+    return 0 if rule.startswith("entry(") else 1
 
 
-def comparator_calls(rule1: str, rule2: str) -> int:
+def comparator_calls(rule: str) -> int:
     '''
     Rules with less recursive calls are considered more-likely than rules with
     more recursive calls. A rule with no recursive call is considered most
     likely. Two rules with different, but the same number of recursive calls are
     assumed to be equally likely.
 
-    For example, rule1 `p(This, null) :- node(This), next(This, Next), p(Next).`
-    is considered more-likely when compared to rule2 `p(This, Par1) :-
-    node(This), next(This, Next), p(Next), p(Par1).` in which case the
-    comparator yields `-1` as output.
+    For example, the rule `p(This, null) :- node(This), next(This, Next),
+    p(Next).` yields `1` and is considered more-likely than the rule `p(This,
+    Par1) :- node(This), next(This, Next), p(Next), p(Par1).`, which yields `2`
+    as output.
     '''
-    _, tail1 = rule1.split(constants.DELIMITER_RULE)
-    _, tail2 = rule2.split(constants.DELIMITER_RULE)
-    calls1 = tail1.count("p(")
-    calls2 = tail2.count("p(")
+    _, tail = rule.split(constants.DELIMITER_RULE)
+    return tail.count("p(")
 
-    if calls1 < calls2:
-        return -1
-    elif calls1 > calls2:
-        return 1
-    else:
-        return 0
+
+def comparator_nullArgs(rule: str) -> int:
+    '''
+    Counts the occurce of `null` in arguments of recursive calls. Observe that
+    by applying the comparator `comparator_calls` first ensures that rules are
+    only compared by this feature if they have the same number of recursive
+    calls. And with respect to the rule generation procedure, each recursive
+    call has the same number of arguments.
+
+    For example, the rule `p(This) :- node(This), next(This, Next), p(Next,
+    This).` yields `0` and is considered more-likely than the rule `p(This) :-
+    node(This), next(This, Next), p(Next, null).`, which yields `1` as output.
+    '''
+    _, tail = rule.split(constants.DELIMITER_RULE)
+    return sum(
+        [i.count("null") for i in re.findall(constants.RE_REC_CALLS, tail)]
+    )
 
 
-def comparator_nullArgs(rule1: str, rule2: str) -> int:
+def comparator_nullParams(rule: str) -> int:
     '''
-    Compares two rules regarding the occurce of `null` in arguments of
-    recursive calls. Observe that by applying the comparator
-    `comparator_calls` first ensures that both rules have the same number of
-    recursive calls. And with respect to the rule generation procedure, each
-    recursive call has the same number of arguments.
+    Counts the occurce of `null` in the list of parameters. Note that by
+    construction we can assume that rules have the same number of parameters.
+    However, this does not nececssarily hold if one is an `entry` rule and the
+    other is a `p` rule. But note that such situations are prevented, because
+    the overall key contains the feature `comparator_pname` before already.
+
+    For example, the rule `p(This, This) :- node(This), next(This, Next),
+    p(Next).` yields `0` and is considered more-likely than the rule `p(This,
+    null) :- node(This), next(This, Next), p(Next).`, which yields `1` as
+    output.
+    '''
+    head, _ = rule.split(constants.DELIMITER_RULE)
+    return head.count(constants.NULL_LOWER)
 
-    For example, rule1 `p(This) :- node(This), next(This, Next), p(Next, This).`
-    is considered more-likely when compared to rule2 `p(This) :- node(This),
-    next(This, Next), p(Next, null).` in which case the comparator yields `-1`
-    as output.
+
+def comparator_paramsAsArgs(rule: str) -> int:
     '''
-    _, tail1 = rule1.split(constants.DELIMITER_RULE)
-    _, tail2 = rule2.split(constants.DELIMITER_RULE)
-    nulls1 = sum(
-        [i.count("null") for i in re.findall(constants.RE_REC_CALLS, tail1)]
-    )
-    nulls2 = sum(
-        [i.count("null") for i in re.findall(constants.RE_REC_CALLS, tail2)]
+    Counts how often parameters are used as the first argument in recursive
+    calls.
+
+    For example, the rule `p(This, This, null) :- node(This), next(This, Next),
+    p(Next).` yields `0` and is considered more-likely than the rule `p(This,
+    Par1, null) :- node(This), next(This, Next), p(Par1).`, which yields `1` as
+    output.
+    '''
+    _, tail = rule.split(constants.DELIMITER_RULE)
+    pattern = r'p\(Par\d*(?:, \w+)*\)'
+    return len(re.findall(pattern, tail))
+
+
+def comparator_nullFields(rule: str) -> int:
+    '''
+    Counts the fields of a rule that are assigned `null`.
+
+    For example, the rule `p(This) :- node(This), left(This, null),
+    right(This, Right), p(Right).` yields `1` as output.
+    '''
+    return list(extractFieldAssignment(rule).values()).count(constants.NULL_LOWER)
+
+
+def comparator_frequency(rule: str, frequencies: Dict) -> int:
+    '''
+    Yields the negated number of vertices whose vertex abstraction is matched
+    by the field assignment of a rule, see function `abstractionFrequencies`.
+    For entry rules, only the entry nodes are taken into account, otherwise
+    only the non entry nodes. Hence, rules that match many vertices are
+    considered more-likely.
+    '''
+    pname = constants.PNAME_ENTRY if rule.startswith("entry(") else constants.PNAME_OTHER
+    encoded = tuple(
+        encodeAssignment(extractFieldAssignment(rule), frequencies['fields'])
     )
-    if nulls1 < nulls2:
-        return -1
-    elif nulls1 > nulls2:
-        return 1
-    else:
-        return 0
+    return -frequencies[pname].get(encoded, 0)
 
 
-def comparator_nullParams(rule1: str, rule2: str) -> int:
+def abstractionFrequencies(memoryGraphs: List[MemoryGraph]) -> Dict:
     '''
-    Compares two rules regarding their occurce of `null` in the list of
-    parameters. Note that by construction we can assume that both rules have the
-    same number of parameters. However, this does not nececssarily hold if one
-    is an `entry` rule and the other is a `p` rule. But note that such
-    situations are prevented, because the overall comparator conducts a
-    comparison on this property before already, see `comparator_pname`.
+    Counts how often each vertex abstraction occurs among the vertices of the
+    memory graphs, separately for entry nodes and non entry nodes. In contrast
+    to `MemoryGraph.vertexAbstractionOthers`, abstractions are not
+    deduplicated, see `MemoryGraph.vertexAbstractionCounts`. The abstractions
+    are encoded using function `encodeAssignment`.
 
-    For example, rule1 `p(This, This) :- node(This), next(This, Next), p(Next).`
-    is considered more-likely when compared to rule2 `p(This, null) :-
-    node(This), next(This, Next), p(Next).` in which case the comparator yields
-    `-1` as output.
+    The result is to be used with function `optimizeOrderOfRules`.
     '''
-    head1, _ = rule1.split(constants.DELIMITER_RULE)
-    head2, _ = rule2.split(constants.DELIMITER_RULE)
-    nulls1 = head1.count(constants.NULL_LOWER)
-    nulls2 = head2.count(constants.NULL_LOWER)
+    fields = memoryGraphs[0].fields()
+    frequencies = {
+        'fields': fields,
+        constants.PNAME_ENTRY: {},
+        constants.PNAME_OTHER: {}
+    }
 
-    if nulls1 < nulls2:
-        return -1
-    elif nulls1 > nulls2:
-        return 1
-    else:
-        return 0
+    def count(pname, abstraction, n=1):
+        encoded = tuple(encodeAssignment(abstraction, fields))
+        frequencies[pname][encoded] = frequencies[pname].get(encoded, 0) + n
+
+    for memoryGraph in memoryGraphs:
+        for abstractions in memoryGraph.vertexAbstractionEPs().values():
+            for abstraction in abstractions:
+                count(constants.PNAME_ENTRY, abstraction)
+        for abstraction, n in memoryGraph.vertexAbstractionCounts():
+            count(constants.PNAME_OTHER, abstraction, n)
+    return frequencies
 
 
-def comparator_paramsAsArgs(rule1: str, rule2: str) -> int:
+def comparator_model(rule: str, model: Dict) -> float:
     '''
-    Compares two rules regarding how often parameters are used as the first
-    argument in recursive calls.
+    Scores a rule using a rule ordering model, see function
+    `trainOrderingModel`. The score is the negative log-likelihood of the
+    features of the rule wrt. the rules of the same predicate, i.e., `entry` or
+    `p`, the model was trained with. Hence, rules whose features frequently
+    occur in learned shape predicates yield a smaller score and are considered
+    more-likely. Feature values not observed during training are smoothed.
+    '''
+    pname = constants.PNAME_ENTRY if rule.startswith("entry(") else constants.PNAME_OTHER
+    count = model['rules'].get(pname, 0)
+    score = 0.0
+    features = model['features']
+    for feature, comparator in zip(features, modelComparators(features)):
+        value2count = model['counts'].get(pname, {}).get(feature, {})
+        value = str(comparator(rule))
+        score -= math.log(
+            (value2count.get(value, 0) + 1) / (count + len(value2count) + 1)
+        )
+    return score
 
-    For example, rule1 `p(This, Par1, null) :- node(This), next(This, Next),
-    p(Par1).` is considered more-likely when compared to rule2 `p(This, This,
-    null) :- node(This), next(This, Par1), p(Next).` in which case the
-    comparator yields `-1` as output.
+
+def trainOrderingModel(predicates: List[List[str]], features=None) -> Dict:
     '''
-    _, tail1 = rule1.split(constants.DELIMITER_RULE)
-    _, tail2 = rule2.split(constants.DELIMITER_RULE)
-    pattern = r'p\(Par\d*(?:, \w+)*\)'
-    calls1 = len(re.findall(pattern, tail1))
-    calls2 = len(re.findall(pattern, tail2))
+    Trains a lightweight rule ordering model from a list of shape predicates,
+    e.g., the rules templates or the results of `learn` and `match`. For each
+    predicate, i.e., `entry` and `p`, the model counts how often each feature
+    value occurs among the rules. The model is a JSON serializable dictionary
+    to be used with function `optimizeOrderOfRules`.
+
+    The `features` parameter contains a list of names of comparator functions
+    of this module, defaulting to `constants.MODEL_FEATURES`, see function
+    `modelComparators`.
+    '''
+    if features is None:
+        features = constants.MODEL_FEATURES
+    comparators = modelComparators(features)
+
+    model = {'features': list(features), 'rules': {}, 'counts': {}}
+    for predicate in predicates:
+        for rule in predicate:
+            pname = constants.PNAME_ENTRY if rule.startswith("entry(") else constants.PNAME_OTHER
+            model['rules'][pname] = model['rules'].get(pname, 0) + 1
+            counts = model['counts'].setdefault(pname, {})
+            for feature, comparator in zip(features, comparators):
+                value2count = counts.setdefault(feature, {})
+                value = str(comparator(rule))
+                value2count[value] = value2count.get(value, 0) + 1
+    return model
+
+
+def modelComparators(features: List[str]) -> List:
+    '''
+    Returns the comparator of each feature of a rule ordering model given the
+    names of the features, which are looked up in the registry
+    `constants.MODEL_COMPARATORS`. Raises a `ShaPEexception` for unknown
+    feature names.
+    '''
+    unknown = [f for f in features if f not in constants.MODEL_COMPARATORS]
+    if unknown:
+        raise helper.ShaPEexception(
+            f'unknown features of the rule ordering model: {", ".join(map(str, unknown))}, '
+            f'known features are {", ".join(constants.MODEL_COMPARATORS)}'
+        )
+    return [constants.MODEL_COMPARATORS[f] for f in features]
 
-    if calls1 > calls2:
-        return 1
-    elif calls1 < calls2:
-        return -1
-    else:
-        return 0
 
+def validateOrderingModel(model: Dict) -> Dict:
+    '''
+    Checks that a loaded rule ordering model, see function
+    `trainOrderingModel`, is well-formed and only uses known features, see
+    function `modelComparators`. Raises a `ShaPEexception` otherwise and
+    returns the model if it is valid.
+    '''
+    if not isinstance(model, dict) or \
+            not {'features', 'rules', 'counts'} <= model.keys():
+        raise helper.ShaPEexception(
+            'a rule ordering model must contain features, rules and counts')
+    modelComparators(model['features'])
+    return model
 
-def pruneRules(rules: List[str], memoryGraphs: List[MemoryGraph]) -> List[str]:
+
+class PruningStatistics(object):
+    '''
+    Collects the number of rules before and after each pruning pass of function
+    `pruneRules` as well as the time spent in the pass. The passes are listed
+    in the order they are first conducted and repeated passes, e.g., for
+    multiple shards, are accumulated. For shards processed in parallel, the
+    time is the sum over all shards.
+    '''
+
+    def __init__(self) -> None:
+        self.passes = []
+        '''
+        The list of passes, each a dictionary with the keys `name`,
+        `rules_in`, `rules_out`, and `elapsed`.
+        '''
+
+    def record(self, name: str, rules_in: int, rules_out: int, elapsed: float) -> None:
+        '''
+        Records a conducted pruning pass.
+        '''
+        for pass_ in self.passes:
+            if pass_['name'] == name:
+                pass_['rules_in'] += rules_in
+                pass_['rules_out'] += rules_out
+                pass_['elapsed'] += elapsed
+                return
+        self.passes.append({
+            'name': name,
+            'rules_in': rules_in,
+            'rules_out': rules_out,
+            'elapsed': elapsed
+        })
+
+    def merge(self, other: 'PruningStatistics') -> None:
+        '''
+        Accumulates the passes recorded by another instance.
+        '''
+        for pass_ in other.passes:
+            self.record(**pass_)
+
+    def measure(self, name: str, function, rules: List[str]) -> List[str]:
+        '''
+        Applies a pruning pass `function` to the rules and records it.
+        '''
+        start = time.perf_counter()
+        rules_ = function(rules)
+        self.record(name, len(rules), len(rules_), time.perf_counter() - start)
+        return rules_
+
+    def asList(self) -> List[Dict]:
+        '''
+        Returns the passes including their kill ratio, i.e., the share of
+        removed rules, as a JSON serializable list.
+        '''
+        return [
+            dict(
+                pass_,
+                ratio=1 - pass_['rules_out'] / pass_['rules_in'] if pass_['rules_in'] else 0.0
+            )
+            for pass_ in self.passes
+        ]
+
+
+def pruneRules(
+        rules: List[str],
+        memoryGraphs: List[MemoryGraph],
+        processes: int = None,
+        statistics: PruningStatistics = None
+) -> List[str]:
     '''
     Conducts a rule pruning by removing rules that either do not match the
     node abstraction, are not feasibly according to a static rule analysis, or
@@ -197,32 +382,140 @@ def pruneRules(rules: List[str], memoryGraphs: List[MemoryGraph]) -> List[str]:
     node abstraction is performed by function `pruneByVertexAbstraction`, static
     rule analysis by function `pruneByStaticAnalysis`, and heuristics by
     function `pruneByHeuristics`.
+
+    Afterwards, the recursive calls across all rules are analyzed by function
+    `pruneByCallAnalysis`.
+
+    All but the removal of commutative calls and the call analysis are checks
+    of single rules. These are conducted on shards of at most
+    `constants.PRUNING_SHARD_SIZE` rules, see function `pruneRulesShard`, which
+    are distributed evenly over a pool of `processes` processes, defaulting to
+    `constants.PRUNING_PROCESSES`. The pool comprises at most one process per
+    `constants.PRUNING_PARALLEL_THRESHOLD` rules and is not started for less
+    than two processes, in which case the shards are conducted sequentially.
+    Along with the shards, the signatures of rules with multiple recursive
+    calls are computed, such that only their comparison remains for the removal
+    of commutative calls. The result does not depend on the number of
+    processes: entry rules precede p rules and both keep their original order.
+
+    If an instance of class `PruningStatistics` is provided, each pass is
+    recorded in it.
+    '''
+    if processes is None:
+        processes = constants.PRUNING_PROCESSES
+    if statistics is None:
+        statistics = PruningStatistics()
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    # each process must prune enough rules to pay off its start
+    processes = min(processes, len(rules) // constants.PRUNING_PARALLEL_THRESHOLD)
+    size = constants.PRUNING_SHARD_SIZE
+    if processes > 1:
+        size = min(size, -(-len(rules) // processes))
+    shards = [rules[pos:pos + size] for pos in range(0, len(rules), size)]
+    if processes > 1:
+        # the memory graphs are passed to each process once, not per shard
+        with multiprocessing.Pool(
+                processes,
+                initializer=initPruningProcess,
+                initargs=(memoryGraphs,)
+        ) as pool:
+            results = pool.map(pruneRulesShardProcess, shards)
+    else:
+        results = [
+            pruneRulesShardStatistics(shard, memoryGraphs)
+            for shard in shards
+        ]
+    shards = []
+    signatures = {}
+    for shard, shard_signatures, shard_statistics in results:
+        shards.append(shard)
+        signatures.update(shard_signatures)
+        statistics.merge(shard_statistics)
+    rules = [r for shard in shards for r in shard]
+    logger().debug(
+        f'Completed node abstraction, static rule pruning and heuristic rule '
+        f'pruning of {len(shards)} shards'
+    )
+
+    # combine pruned rules
+    rulesEP = [r for r in rules if r.startswith("entry(")]
+    rulesOther = [r for r in rules if not r.startswith("entry(")]
+    rules = rulesEP + rulesOther
+
+    # static rule analysis across all shards, commutative calls only occur if
+    # rules have more than one recursive call, whose signatures have already
+    # been computed along with the shards
+    if signatures:
+        rules = statistics.measure(
+            'commutative calls',
+            lambda rules_: pruneCommutativeCalls(rules_, signatures),
+            rules
+        )
+    logger().debug(
+        f'Completed commutative calls pruning'
+    )
+
+    rules = pruneByCallAnalysis(rules, statistics)
+    logger().debug(
+        f'Completed call analysis pruning'
+    )
+
+    for pass_ in statistics.passes:
+        logger().debug(
+            f'pruning pass {pass_["name"]}: {pass_["rules_in"]} -> '
+            f'{pass_["rules_out"]} rules in {pass_["elapsed"]:.3f}s'
+        )
+
+    return rules
+
+
+def pruneRulesShard(
+        rules: List[str],
+        memoryGraphs: List[MemoryGraph],
+        statistics: PruningStatistics = None
+) -> List[str]:
     '''
+    Conducts the checks of single rules of function `pruneRules`, i.e., the
+    node abstraction as well as the static rule analysis and the heuristics
+    except for the removal of commutative calls. The remaining rules keep their
+    original order. If an instance of class `PruningStatistics` is provided,
+    each pass is recorded in it.
+    '''
+    if statistics is None:
+        statistics = PruningStatistics()
+
     # node abstraction
     rulesEP = [r for r in rules if r.startswith("entry(")]
     rulesOther = [r for r in rules if not r.startswith("entry(")]
 
-    # node abstraction for entry rules
-    if len(memoryGraphs) == 1:
-        memoryGraph = memoryGraphs[0]
+    # node abstraction for entry rules, where an entry rule must match the
+    # entry node of its entry pointer in at least one memory graph
+    names = [ep["name"] for ep in memoryGraphs[0].entrypoints()]
+    ep2abstractions = {name: [] for name in names}
+    for memoryGraph in memoryGraphs:
+        abstractions = memoryGraph.vertexAbstractionEPs()
+        for name, ep in zip(names, memoryGraph.entrypoints()):
+            ep2abstractions[name].extend(abstractions[ep["name"]])
+
+    def pruneEntryRules(rulesEP):
         ep2rules = {}
         for rule in rulesEP:
-            relevant_ep = helper.relevantEPname(rule, memoryGraph)
+            relevant_ep = helper.relevantEPname(rule, memoryGraphs[0])
             if relevant_ep not in ep2rules.keys():
                 ep2rules[relevant_ep] = []
             ep2rules[relevant_ep].append(rule)
-        rulesEP_ = []
+        rulesEP_ = set()
         for ep, ep_rules in ep2rules.items():
-            rulesEP_.extend(
+            rulesEP_.update(
                 pruneByVertexAbstraction(
                     ep_rules,
-                    memoryGraph.vertexAbstractionEPs()[ep]
+                    ep2abstractions[ep]
                 )
             )
-        rulesEP = rulesEP_
-    logger().debug(
-        f'Completed node abstraction for entry rules'
-    )
+        return [r for r in rulesEP if r in rulesEP_]
+    rulesEP = set(statistics.measure('entry abstraction', pruneEntryRules, rulesEP))
 
     # node abstraction for p rules
     vertexAbstractionsOther = []
@@ -234,32 +527,80 @@ def pruneRules(rules: List[str], memoryGraphs: List[MemoryGraph]) -> List[str]:
             tuple(sorted(d.items())) for d in vertexAbstractionsOther
         }
     ]
-    rulesOther = pruneByVertexAbstraction(
-        rulesOther,
-        vertexAbstractionsOther
-    )
-    logger().debug(
-        f'Completed node abstraction for p rules'
-    )
+    rulesOther = set(statistics.measure(
+        'p abstraction',
+        lambda rules_: pruneByVertexAbstraction(rules_, vertexAbstractionsOther),
+        rulesOther
+    ))
+    # entry rules must relate their fields to the other entry pointers
+    rulesEP = set(statistics.measure(
+        'entry pointer fields',
+        lambda rules_: pruneByEntryPointerFields(rules_, memoryGraphs),
+        [r for r in rules if r in rulesEP]
+    ))
+
+    rules = [
+        r for r in rules
+        if r in rulesOther or r in rulesEP
+    ]
 
-    # combine pruned rules
-    rules = rulesEP + rulesOther
-
-    # static rule analysis
-    rules = pruneByStaticAnalysis(rules)
-    logger().debug(
-        f'Completed static rule pruning'
-    )
+    # static rule analysis except for the removal of commutative calls
+    rules = pruneByStaticAnalysis(rules, commutative=False, statistics=statistics)
 
     # heuristics
-    rules = pruneByHeuristics(rules)
-    logger().debug(
-        f'Completed heuristic rule pruning'
-    )
+    rules = pruneByHeuristics(rules, statistics)
 
     return rules
 
 
+def pruneRulesShardStatistics(
+        rules: List[str],
+        memoryGraphs: List[MemoryGraph]
+) -> Tuple[List[str], Dict[str, Tuple], PruningStatistics]:
+    '''
+    Conducts function `pruneRulesShard` and additionally returns the signatures,
+    see function `callOrderSignature`, of the remaining rules with more than
+    one recursive call as well as the recorded statistics, e.g., to collect
+    these from another process. The time spent on the signatures is recorded
+    for the removal of commutative calls.
+    '''
+    statistics = PruningStatistics()
+    rules = pruneRulesShard(rules, memoryGraphs, statistics)
+    start = time.perf_counter()
+    signatures = {
+        r: callOrderSignature(r) for r in rules
+        if r.split(constants.DELIMITER_RULE)[1].count("p(") > 1
+    }
+    if signatures:
+        statistics.record(
+            'commutative calls', 0, 0, time.perf_counter() - start
+        )
+    return rules, signatures, statistics
+
+
+# the memory graphs of the pruning processes, see function `initPruningProcess`
+_memoryGraphs = None
+
+
+def initPruningProcess(memoryGraphs: List[MemoryGraph]) -> None:
+    '''
+    Initializes a process of the pool of function `pruneRules` with the memory
+    graphs, such that these are only transferred once per process.
+    '''
+    global _memoryGraphs
+    _memoryGraphs = memoryGraphs
+
+
+def pruneRulesShardProcess(
+        rules: List[str]
+) -> Tuple[List[str], Dict[str, Tuple], PruningStatistics]:
+    '''
+    Conducts function `pruneRulesShardStatistics` in a process initialized by
+    function `initPruningProcess`.
+    '''
+    return pruneRulesShardStatistics(rules, _memoryGraphs)
+
+
 def pruneByVertexAbstraction(rules: List[str], abstractions: List[Dict[str, str]]) -> List[str]:
     '''
     For a given list of rules and a list of node abstraction, this function
@@ -274,49 +615,127 @@ def pruneByVertexAbstraction(rules: List[str], abstractions: List[Dict[str, str]
     For example, the rule `p(This) :- node(This), left(This, Left), right(This,
     null), true.` matches the abstraction `{'left': 'Var0', 'right': 'null'}`,
 
+    Internally, the rules and the abstractions are encoded as integer matrices
+    using function `encodeAssignment`. A rule matches an abstraction iff their
+    encodings are equal, which is checked for all rules at once.
     '''
+    if not abstractions:
+        return []
+    fields = list(abstractions[0].keys())
 
-    def ruleMatchesAbstraction(rule: str, abstraction: Dict) -> bool:
-        '''
-        Check if a rule matches a node abstraction.
-        '''
+    encodedAbstractions = numpy.unique(numpy.array(
+        [encodeAssignment(a, fields) for a in abstractions],
+        dtype=numpy.int16
+    ).reshape(len(abstractions), len(fields)), axis=0)
+
+    encodedRules = []
+    for rule in rules:
         assignment = extractFieldAssignment(rule)
-        assert assignment.keys() == abstraction.keys()
+        assert assignment.keys() == abstractions[0].keys()
+        encodedRules.append(encodeAssignment(assignment, fields))
+    encodedRules = numpy.array(
+        encodedRules,
+        dtype=numpy.int16
+    ).reshape(len(rules), len(fields))
 
-        for field in abstraction.keys():
-            if assignment[field] == "null" and abstraction[field] != "null":
-                return False
-            elif assignment[field] != "null" and abstraction[field] == "null":
-                return False
-            elif assignment[field] == "This" and abstraction[field] != "This":
-                return False
-            elif assignment[field] != "This" and abstraction[field] == "This":
-                return False
+    matches = numpy.zeros(len(rules), dtype=bool)
+    for encodedAbstraction in encodedAbstractions:
+        matches |= (encodedRules == encodedAbstraction).all(axis=1)
+
+    return [rule for rule, match in zip(rules, matches) if match]
 
-            abstractionKeys = [
-                f for f in abstraction.keys()
-                if abstraction[f] == abstraction[field]
-            ]
-            assignmentKeys = [
-                f for f in assignment.keys()
-                if assignment[f] == assignment[field]
-            ]
-            if abstractionKeys != assignmentKeys:
+
+def pruneByEntryPointerFields(
+        rules: List[str],
+        memoryGraphs: List[MemoryGraph]
+) -> List[str]:
+    '''
+    Removes entry rules whose fields do not point to the entry pointer targets
+    of any memory graph as stated by the head of the rule. The entry node of an
+    entry rule is the target of the entry pointer at the position of `This` in
+    the head, see function `helper.relevantEPname`. A field assigned to a
+    parameter `ParX` must point to the target of the entry pointer at the
+    position of `ParX`, and a field assigned to any other variable must point to
+    a node that is neither `null` nor the target of an entry pointer passed as a
+    variable, since different variables hold different values. The assignment
+    of fields to `null` and `This` is checked by the node abstraction.
+
+    For example, given the entry pointers `n1` and `n2` and `next(n1, n2)`,
+    the entry rule `entry(This, Par1) :- node(This), next(This, Par1), true.`
+    is kept, whereas `entry(This, Par1) :- node(This), next(This, Next),
+    p(Next), p(Par1), true.` and `entry(Par0, This) :- node(This), next(This,
+    Par0), true.` are removed.
+    '''
+    graphs = []
+    for memoryGraph in memoryGraphs:
+        targets = [ep['target'] for ep in memoryGraph.entrypoints()]
+        fields = [
+            {
+                a['name']: a['value']
+                for a in memoryGraph.vertex(target)['assignment']
+            }
+            if target != constants.NULL_UPPER else {}
+            for target in targets
+        ]
+        graphs.append((targets, fields))
+
+    def matches(params, assignment, targets, fields):
+        fields = fields[params.index('This')]
+        bound = {
+            target for param, target in zip(params, targets)
+            if param != constants.NULL_LOWER
+        }
+        for field, value in assignment.items():
+            if value in [constants.NULL_LOWER, 'This']:
+                continue
+            if value in params:
+                if fields.get(field) != targets[params.index(value)]:
+                    return False
+            elif fields.get(field) in bound or \
+                    fields.get(field) in [None, constants.NULL_UPPER]:
                 return False
         return True
 
     return [
-        rule for rule in rules
+        r for r in rules
         if any(
-            [
-                ruleMatchesAbstraction(rule, abstraction)
-                for abstraction in abstractions
-            ]
+            matches(
+                extractHeadParameters(r), extractFieldAssignment(r),
+                targets, fields
+            )
+            for targets, fields in graphs
         )
     ]
 
 
-def pruneByStaticAnalysis(rules: List[str]) -> List[str]:
+def encodeAssignment(assignment: Dict[str, str], fields: List[str]) -> List[int]:
+    '''
+    Encodes the values of the given fields of a field assignment or node
+    abstraction as integers: `null` is encoded as `-1`, `This` as `-2`, and any
+    other value as the position of the first field holding the same value.
+    Hence, two assignments have equal encodings iff they agree on the fields
+    being `null` or `This` and on the fields holding equal values.
+
+    The input `{'left': 'Left', 'right': 'null', 'parent': 'Left'}, ['left',
+    'right', 'parent']` yields `[0, -1, 0]` as output.
+    '''
+    values = [assignment[f] for f in fields]
+    encoding = []
+    for value in values:
+        if value == constants.NULL_LOWER:
+            encoding.append(-1)
+        elif value == "This":
+            encoding.append(-2)
+        else:
+            encoding.append(values.index(value))
+    return encoding
+
+
+def pruneByStaticAnalysis(
+        rules: List[str],
+        commutative: bool = True,
+        statistics: PruningStatistics = None
+) -> List[str]:
     '''
     Conducts a static rule analysis and removes rules that are not feasiable,
     i.e., always yield a resource failure. The following static analysis
@@ -325,12 +744,31 @@ def pruneByStaticAnalysis(rules: List[str]) -> List[str]:
     - `hasRecursiveCallsToThis`
     - `hasRecursiveCallsToNull`
     - `hasIdenticalRecursiveCalls`
-    - `pruneCommutativeCalls`
+    - `pruneCommutativeCalls`, unless `commutative` is `False`
 
+    If an instance of class `PruningStatistics` is provided, each pass is
+    recorded in it.
     '''
-    rules = [r for r in rules if not hasRecursiveCallsToThis(r)]
-    rules = [r for r in rules if not hasRecursiveCallsToNull(r)]
-    rules = [r for r in rules if not hasIdenticalRecursiveCalls(r)]
+    if statistics is None:
+        statistics = PruningStatistics()
+    rules = statistics.measure(
+        'calls to This',
+        lambda rules_: [r for r in rules_ if not hasRecursiveCallsToThis(r)],
+        rules
+    )
+    rules = statistics.measure(
+        'calls to null',
+        lambda rules_: [r for r in rules_ if not hasRecursiveCallsToNull(r)],
+        rules
+    )
+    rules = statistics.measure(
+        'identical calls',
+        lambda rules_: [r for r in rules_ if not hasIdenticalRecursiveCalls(r)],
+        rules
+    )
+
+    if not commutative:
+        return rules
 
     def numberOfRecursiveCalls(rule):
         _, tail = rule.split(constants.DELIMITER_RULE)
@@ -338,7 +776,7 @@ def pruneByStaticAnalysis(rules: List[str]) -> List[str]:
 
     # commutative calls only occur if rules have more than one recursive call
     if any([numberOfRecursiveCalls(r) > 1 for r in rules]):
-        rules = pruneCommutativeCalls(rules)
+        rules = statistics.measure('commutative calls', pruneCommutativeCalls, rules)
 
     return rules
 
@@ -387,7 +825,154 @@ def hasIdenticalRecursiveCalls(rule: str) -> bool:
     return len(matches) != len(set(matches))
 
 
-def pruneCommutativeCalls(rules: List[str]) -> List[str]:
+def pruneByCallAnalysis(rules: List[str], statistics: PruningStatistics = None) -> List[str]:
+    '''
+    Conducts a static analysis of the recursive calls across all candidate
+    rules and removes rules that can never be part of a successful derivation.
+    The following analysis functions are employed until none of them removes
+    any further rule:
+
+    - `pruneUnreachableRules`
+    - `pruneConsumedParameterCalls`
+    - `pruneUnproductiveRules`
+
+    The analysis relies on the fact that different variables of a rule hold
+    different values and that only `null` is passed as `null`, see function
+    `search.inject_inequalities`. Hence, a call can only be resolved by a `p`
+    rule whose head exhibits the same pattern, see function
+    `helper.entryPattern`, as the arguments of the call.
+
+    If an instance of class `PruningStatistics` is provided, each pass is
+    recorded in it once, i.e., with the number of rules before its first
+    application and the rules it removed over all iterations.
+    '''
+    if statistics is None:
+        statistics = PruningStatistics()
+    passes = [
+        ('unreachable rules', pruneUnreachableRules),
+        ('consumed parameter calls', pruneConsumedParameterCalls),
+        ('unproductive rules', pruneUnproductiveRules)
+    ]
+    rules_in = {}
+    removed = {name: 0 for name, _ in passes}
+    elapsed = {name: 0.0 for name, _ in passes}
+    while True:
+        count = len(rules)
+        for name, function in passes:
+            rules_in.setdefault(name, len(rules))
+            start = time.perf_counter()
+            rules_ = function(rules)
+            elapsed[name] += time.perf_counter() - start
+            removed[name] += len(rules) - len(rules_)
+            rules = rules_
+        if len(rules) == count:
+            break
+    for name, _ in passes:
+        statistics.record(
+            name, rules_in[name], rules_in[name] - removed[name], elapsed[name])
+    return rules
+
+
+def pruneUnreachableRules(rules: List[str]) -> List[str]:
+    '''
+    Removes `p` rules that cannot be reached from any entry rule. Starting from
+    the recursive calls of the entry rules, a `p` rule is reachable if its head
+    exhibits the pattern of a reachable call, in which case the calls of the
+    rule are reachable as well. Hence, the parameters of an unreachable rule
+    are compared against values that no caller ever passes, as the head of a
+    rule compares its parameters against `null` and among each other.
+
+    For example, the rule `p(This, This) :- node(This), next(This, null),
+    true.` is unreachable if no rule contains a call like `p(Next, Next)`, and
+    the rule `p(This, null) :- node(This), next(This, null), true.` is
+    unreachable if no rule contains a call like `p(Next, null)`.
+    '''
+    patterns = set()
+    pending = [r for r in rules if r.startswith("entry(")]
+    reachable = set(pending)
+    others = [r for r in rules if not r.startswith("entry(")]
+    while pending:
+        for rule in pending:
+            patterns.update(
+                helper.entryPattern(c) for c in extractCallArguments(rule)
+            )
+        pending = [
+            r for r in others
+            if r not in reachable
+            and helper.entryPattern(extractHeadParameters(r)) in patterns
+        ]
+        reachable.update(pending)
+    return [r for r in rules if r in reachable]
+
+
+def pruneConsumedParameterCalls(rules: List[str]) -> List[str]:
+    '''
+    Removes `p` rules with a recursive call on a parameter `ParX`, i.e., the
+    node of the parameter is to be consumed by the call, although every call
+    resolvable by the rule passes the already consumed node `This` of the
+    caller as parameter `ParX`.
+
+    For example, the rule `p(This, Par1) :- node(This), next(This, null),
+    p(Par1), true.` is removed if each call like `p(Next, Other)` reads `p(Next,
+    This)`.
+    '''
+    pattern2calls = {}
+    for rule in rules:
+        for call in extractCallArguments(rule):
+            pattern2calls.setdefault(helper.entryPattern(call), []).append(call)
+
+    def consumesConsumedParameter(rule):
+        params = extractHeadParameters(rule)
+        calls = pattern2calls.get(helper.entryPattern(params), [])
+        for call in extractCallArguments(rule):
+            if call[0] not in params[1:]:
+                continue
+            pos = params.index(call[0])
+            if calls and all(c[pos] == "This" for c in calls):
+                return True
+        return False
+
+    return [
+        r for r in rules
+        if r.startswith("entry(") or not consumesConsumedParameter(r)
+    ]
+
+
+def pruneUnproductiveRules(rules: List[str]) -> List[str]:
+    '''
+    Removes rules that cannot terminate. A rule is productive if each of its
+    recursive calls can be resolved by a productive `p` rule with a matching
+    head, and rules without recursive calls are productive. As any derivation
+    is finite, only productive rules can be applied. In particular, if there is
+    no `p` rule without recursive calls then no rule with a recursive call is
+    productive.
+    '''
+    patterns = set()
+    productive = set()
+    pending = rules
+    while True:
+        productive_ = [
+            r for r in pending
+            if all(
+                helper.entryPattern(c) in patterns
+                for c in extractCallArguments(r)
+            )
+        ]
+        if not productive_:
+            break
+        productive.update(productive_)
+        patterns.update(
+            helper.entryPattern(extractHeadParameters(r)) for r in productive_
+            if not r.startswith("entry(")
+        )
+        pending = [r for r in pending if r not in productive]
+    return [r for r in rules if r in productive]
+
+
+def pruneCommutativeCalls(
+        rules: List[str],
+        signatures: Dict[str, Tuple] = None
+) -> List[str]:
     '''
     Removes semantically duplicate rules wrt. the commutativity of the separting
     conjunction operator, i.e., `A * B <=> B * A` for recursive calls `A` and
@@ -398,17 +983,25 @@ def pruneCommutativeCalls(rules: List[str]) -> List[str]:
     at most a single recursive call. Hence, one rule can be dropped from the
     list of candidate rules.
 
-    Internally, the function `onlyDiffersInCallOrder` is used to remove rules
-    that only differ in the order of their recursive calls.
+    Internally, the function `callOrderSignature` is used to identify rules
+    that only differ in the order of their recursive calls. Of such rules, the
+    last one in the list is kept. The optional `signatures` provide the
+    precomputed signatures of all rules with more than one recursive call,
+    e.g., computed in parallel, and any other rule is only a duplicate of an
+    identical rule.
     '''
+    signatures_ = set()
     rules_ = []
-    for pos1, rule1 in enumerate(rules):
-        for rule2 in rules[(pos1 + 1):]:
-            if onlyDiffersInCallOrder(rule1, rule2):
-                break
+    for rule in reversed(rules):
+        if signatures is None:
+            signature = callOrderSignature(rule)
         else:
-            # rule1 has no duplicate rules, i.e., is semantically unique
-            rules_.append(rule1)
+            signature = signatures.get(rule, rule)
+        if signature not in signatures_:
+            # rule has no duplicate rules later on, i.e., is semantically unique
+            signatures_.add(signature)
+            rules_.append(rule)
+    rules_.reverse()
     return rules_
 
 
@@ -427,26 +1020,79 @@ def onlyDiffersInCallOrder(rule1: str, rule2: str) -> bool:
     - `p(This) :- node(This), left(This, Left), right(This, Right), p(Right),
       p(Left), true.`
     '''
-    # neither both are entry nor both are p
-    if rule1.startswith("entry(") and rule2.startswith("p("):
-        return False
-    if rule1.startswith("p(") and rule2.startswith("entry("):
-        return False
+    return callOrderSignature(rule1) == callOrderSignature(rule2)
 
-    if extractOverallAssignment(rule1) != extractOverallAssignment(rule2):
-        # the two rules differ wrt. their assignment (fields and arguments)
-        return False
 
-    # check if the recursive calls are the same
-    _, tail1 = rule1.split(constants.DELIMITER_RULE)
-    _, tail2 = rule2.split(constants.DELIMITER_RULE)
-    from collections import Counter
-    calls_rule1 = Counter(re.findall(constants.RE_REC_CALLS, tail1))
-    calls_rule2 = Counter(re.findall(constants.RE_REC_CALLS, tail2))
-    return calls_rule1 == calls_rule2
+def callOrderSignature(rule: str) -> Tuple:
+    '''
+    Computes a signature of a rule that is independent from the order of its
+    recursive calls. The signature consists of the kind of the rule, i.e.,
+    entry or p, its assignment of fields and arguments, see function
+    `extractOverallAssignment`, and the sorted recursive calls. Two rules only
+    differ in the order of their recursive calls iff their signatures are equal.
+    '''
+    _, tail = rule.split(constants.DELIMITER_RULE)
+    return (
+        rule.startswith("entry("),
+        tuple(sorted(extractOverallAssignment(rule).items())),
+        tuple(sorted(re.findall(constants.RE_REC_CALLS, tail)))
+    )
+
 
+def pruneParameterPermutations(rules: List[str]) -> List[str]:
+    '''
+    Removes entry rules that are not canonical wrt. the order of the additional
+    parameters of predicate `p`, see function `isCanonicalEntryRule`.
+
+    Consistently permuting the parameters `Par1`, `Par2`, ... of `p` in all
+    rules of a shape predicate yields a renamed, yet equivalent, shape
+    predicate. As the candidate rules are closed under such permutations, one
+    representative of each permutation class suffices. The representative is
+    chosen such that its entry rule is canonical, whereas the rules of
+    predicate `p` are left unchanged.
+
+    Observe that this only removes entry rules. The rules of `p` cannot be
+    made canonical one at a time, as a permutation applies to all rules of a
+    shape predicate at once.
+
+    Note that a shape predicate for multiple memory graphs may contain multiple
+    entry rules, of which only one can be made canonical. Hence, this pruning
+    technique must only be applied if a single memory graph is given.
+    '''
+    return [
+        r for r in rules
+        if not r.startswith("entry(") or isCanonicalEntryRule(r)
+    ]
 
-def pruneByHeuristics(rules: List[str]) -> List[str]:
+
+def isCanonicalEntryRule(rule: str) -> bool:
+    '''
+    Checks if the recursive calls of an entry rule are canonical wrt. the order
+    of the additional parameters of predicate `p`. The calls are canonical if
+    the sorted list of their arguments is minimal among all permutations of the
+    argument positions `1, 2, ...`. Sorting the calls makes the check
+    independent from the order of the calls, see function
+    `pruneCommutativeCalls`.
+
+    For example, the entry rule `entry(This) :- node(This), next(This, Next),
+    p(Next, This, null), true.` is canonical, because `This` is less than
+    `null`. In contrast, `entry(This) :- node(This), next(This, Next), p(Next,
+    null, This), true.` is not canonical.
+    '''
+    calls = [c[2:-1].split(", ") for c in extractCalls(rule)]
+    if not calls:
+        return True
+    canonical = sorted(calls)
+    for permutation in itertools.permutations(range(1, len(calls[0]))):
+        permuted = sorted(
+            [c[0]] + [c[pos] for pos in permutation] for c in calls
+        )
+        if permuted < canonical:
+            return False
+    return True
+
+
+def pruneByHeuristics(rules: List[str], statistics: PruningStatistics = None) -> List[str]:
     '''
     Removes rules violating particular heuristics. In contrast to static
     analysis, which removes infeasible rules, heuristics remove rules that may
@@ -456,9 +1102,18 @@ def pruneByHeuristics(rules: List[str]) -> List[str]:
     The following heuristics are applied:
 
     - `isSingletonRule`
+
+    If an instance of class `PruningStatistics` is provided, each heuristic is
+    recorded in it.
     '''
+    if statistics is None:
+        statistics = PruningStatistics()
     # singleton heurstics
-    rules = [r for r in rules if not isSingletonRule(r)]
+    rules = statistics.measure(
+        'singleton rules',
+        lambda rules_: [r for r in rules_ if not isSingletonRule(r)],
+        rules
+    )
 
     return rules
 
@@ -537,6 +1192,27 @@ def extractFieldAssignment(rule: str) -> Dict:
     return assignment
 
 
+def extractHeadParameters(rule: str) -> List[str]:
+    '''
+    Extracts the parameters of the head of a rule.
+
+    The input `p(This, null) :- node(This), next(This, Next), p(Next, null),
+    true.` yields `['This', 'null']` as output.
+    '''
+    head, _ = rule.split(constants.DELIMITER_RULE)
+    return head.split("(")[1].split(")")[0].split(", ")
+
+
+def extractCallArguments(rule: str) -> List[List[str]]:
+    '''
+    Extracts the arguments of the recursive calls of a rule.
+
+    The input `p(This, null) :- node(This), next(This, Next), p(Next, null),
+    true.` yields `[['Next', 'null']]` as output.
+    '''
+    return [c[2:-1].split(", ") for c in extractCalls(rule)]
+
+
 def extractEqualities(rule: str):
     return list(re.findall(r"\w* = \w*", rule))
 
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 import copy
-from typing import List
+from typing import Dict, List, Tuple
 
 from . import constants, helper
 from .model import MemoryGraph
@@ -14,28 +14,173 @@ Encodes a rule configuration via the following attributes:
 - entry_arity
 - p_calls
 - entry_calls
+- entry_patterns
 """
 
 
-def generator(fields: List[str], ep_count):
+def generator(fields: List[str], ep_count, memory_graphs: List[MemoryGraph] = None):
     complexity = {}
     fields_count = len(fields)
     complexity['fields'] = fields
 
     complexity['entry_arity'] = ep_count
+    complexity['entry_patterns'] = None
+
+    # without memory graphs, each field may point to a distinct node
+    bounds = {
+        'p_vars': fields_count,
+        'entry_vars': fields_count
+    }
+    if memory_graphs:
+        bounds = complexityBounds(memory_graphs)
+        complexity['entry_patterns'] = entryPatterns(memory_graphs)
 
     for p_arity in range(1, constants.LIMIT_PARAMS + 1):
         complexity['p_arity'] = p_arity
 
-        for p_calls in range(0, fields_count + p_arity - 1 + 1):
+        p_calls_limit = min(
+            fields_count + p_arity - 1,
+            bounds['p_vars'] + p_arity
+        )
+        for p_calls in range(0, p_calls_limit + 1):
             complexity['p_calls'] = list(range(0, p_calls))
 
-            for entry_calls in range(0, fields_count + ep_count+1):
+            for entry_calls in range(0, bounds['entry_vars'] + ep_count+1):
                 complexity['entry_calls'] = list(range(0, entry_calls))
 
                 yield copy.deepcopy(complexity)
 
 
+def entryPatterns(memory_graphs: List[MemoryGraph]) -> List[Tuple]:
+    '''
+    Computes the distinct patterns, see function `helper.entryPattern`, of the
+    entry pointer targets of the memory graphs. As different variables in a
+    rule are forced to hold different values, the head of an applicable entry
+    rule must exhibit one of these patterns. Relations between entry pointers
+    and the fields of entry nodes are not part of the patterns, see function
+    `pruning.pruneByEntryPointerFields`.
+    '''
+    patterns = []
+    for memory_graph in memory_graphs:
+        pattern = helper.entryPattern([ep['target'] for ep in memory_graph.entrypoints()])
+        if pattern not in patterns:
+            patterns.append(pattern)
+    return patterns
+
+
+def complexityBounds(memory_graphs: List[MemoryGraph]) -> Dict[str, int]:
+    '''
+    Derives bounds on the complexity levels yielded by `generator` from the
+    memory graphs. The result contains the following attributes:
+
+    - `p_vars`: the maximal number of distinct non-null, non-This pointer
+      targets in any vertex abstraction of a non entry node
+    - `entry_vars`: the same maximum for the vertex abstractions of entry nodes
+
+    The first argument of each recursive call must be a distinct node, which is
+    either the target of a field or the value of an additional parameter.
+    Hence, a `p` rule requires at most `p_vars + p_arity - 1` and an entry rule
+    at most `entry_vars + ep_count - 1` recursive calls.
+    '''
+    p_vars = 0
+    entry_vars = 0
+
+    def distinctVars(abstraction):
+        return len([
+            v for v in set(abstraction.values())
+            if v not in [constants.NULL_LOWER, 'This']
+        ])
+
+    for memory_graph in memory_graphs:
+        for abstraction in memory_graph.vertexAbstractionOthers():
+            p_vars = max(p_vars, distinctVars(abstraction))
+        for abstractions in memory_graph.vertexAbstractionEPs().values():
+            for abstraction in abstractions:
+                entry_vars = max(entry_vars, distinctVars(abstraction))
+
+    return {
+        'p_vars': p_vars,
+        'entry_vars': entry_vars
+    }
+
+
+def schedule(complexities, memory_graphs: List[MemoryGraph] = None) -> List:
+    '''
+    Orders the complexity levels yielded by `generator` by their conciseness,
+    likelihood of success, and predicted cost. In contrast to the generator,
+    levels of different arities of `p` are interleaved. The ordering uses the
+    following tie-breaking rule:
+
+    1. Levels with a smaller conciseness rank come first, where the rank of a
+       level is `p_arity + len(p_calls) + len(entry_calls)`, i.e., the number
+       of parameters of `p` plus the number of recursive call counts of `p` and
+       entry rules. Hence, a predicate found at a lower rank is more concise
+       than any predicate of a higher rank, and the most concise predicate is
+       still returned first. For example, a level of arity 1 with many entry
+       calls may come before a level of arity 2.
+    2. Among levels of the same rank, levels that are more likely to succeed
+       come first, see function `likelihood`.
+    3. Among levels of the same rank and likelihood, levels with a smaller
+       predicted cost come first, see function `cost`.
+    4. Remaining ties keep the order of the generator.
+
+    The likelihood of each level is computed once. Levels that cannot succeed
+    at all, i.e., whose likelihood is `0`, are dropped.
+    '''
+    levels = []
+    for pos, complexity in enumerate(complexities):
+        likelihood_ = likelihood(complexity, memory_graphs)
+        if likelihood_ <= 0:
+            continue
+        rank = complexity['p_arity'] + \
+            len(complexity['p_calls']) + len(complexity['entry_calls'])
+        levels.append((
+            (rank, -likelihood_, cost(complexity), pos),
+            complexity
+        ))
+
+    return [c for _, c in sorted(levels, key=lambda level: level[0])]
+
+
+def likelihood(complexity, memory_graphs: List[MemoryGraph] = None) -> float:
+    '''
+    Estimates the likelihood that a complexity level yields a shape predicate
+    for the memory graphs as a value between `0` and `1`.
+
+    A level without entry rules never succeeds, and neither does a level
+    without `p` rules if the memory graphs contain non entry nodes. Otherwise,
+    the likelihood is derived from the share of vertex abstractions whose
+    distinct non-null, non-This field targets can all be consumed by recursive
+    calls of the level. Other abstractions require additional parameters and
+    are considered less likely to be captured.
+    '''
+    if not complexity['entry_calls']:
+        return 0.0
+    if not memory_graphs:
+        return 1.0
+
+    def share(abstractions, calls):
+        abstractions = list(abstractions)
+        covered = [
+            a for a in abstractions
+            if len(set(a.values()) - {constants.NULL_LOWER, 'This'}) <= calls
+        ]
+        return (len(covered) + 1) / (len(abstractions) + 1)
+
+    abstractions_ep = []
+    abstractions_other = []
+    for memory_graph in memory_graphs:
+        for abstractions in memory_graph.vertexAbstractionEPs().values():
+            abstractions_ep.extend(abstractions)
+        abstractions_other.extend(memory_graph.vertexAbstractionOthers())
+
+    if abstractions_other and not complexity['p_calls']:
+        return 0.0
+
+    return share(abstractions_ep, max(complexity['entry_calls'])) * \
+        share(abstractions_other, max(complexity['p_calls'], default=0))
+
+
 def generateRules(
         complexity
 ) -> List[str]:
@@ -55,7 +200,8 @@ def generateRules(
             fields=complexity['fields'],
             arguments=complexity['p_arity'],
             calls=entry_calls,
-            pname=constants.PNAME_ENTRY
+            pname=constants.PNAME_ENTRY,
+            patterns=complexity['entry_patterns']
         ))
 
     # synthesize rules for non EP nodes
@@ -71,25 +217,25 @@ def generateRules(
     return rules
 
 
-def buildRules(
+def buildHeads(
         params: int,
-        fields: List[str],
-        arguments: int,
-        calls: int,
-        pname: str
+        pname: str,
+        patterns: List[Tuple] = None
 ) -> List[str]:
     '''
-    Constructs the candidate rules for single rule configuration, i.e., `params`
-    and `calls` are single integers instead of lists. The `pname` parameter
-    denotes the name of the predicate, e.g., `entry` for rules to be used as
-    entry predicate.
+    Constructs the candidate rule heads for a predicate with `params`
+    parameters. The `pname` parameter denotes the name of the predicate, e.g.,
+    `entry` for rules to be used as entry predicate. See function `buildRules`
+    for further documentation.
 
-    The input `params=1, fields=["next"], arguemts=1, calls=0,
-    pname="entry"` yields the following output:
+    The optional parameter `patterns` restricts the heads of entry rules to
+    those exhibiting one of the provided patterns, see function
+    `helper.entryPattern`. The restriction is applied to each partial head, such that
+    only partial heads that are a prefix of a pattern are extended.
 
-    ['entry(This) :- node(This), next(This, null), true.', 'entry(This) :-
-        node(This), next(This, This), true.', 'entry(This) :- node(This),
-        next(This, Next), true.']
+    The input `params=2, pname="p"` yields the following output:
+
+    ['p(This, null)', 'p(This, This)', 'p(This, Par1)']
     '''
     if pname == constants.PNAME_ENTRY:
         # in entry rules, This must not be on first position
@@ -104,6 +250,12 @@ def buildRules(
                     vars_.append("This")
                 for v in vars_:
                     rules_.append((f"{rule}{v}, "))
+            if patterns is not None:
+                rules_ = [
+                    r for r in rules_
+                    if helper.entryPattern(r[len(pname) + 1:-2].split(", "))
+                    in [pattern[:param + 1] for pattern in patterns]
+                ]
             rules = rules_
         rules = [f"{r[:-2]})" for r in rules]
         # drop rules that do not contain This as a parameter
@@ -121,6 +273,33 @@ def buildRules(
             rules = rules_
         rules = [f"{r})" for r in rules]
 
+    return rules
+
+
+def buildRules(
+        params: int,
+        fields: List[str],
+        arguments: int,
+        calls: int,
+        pname: str,
+        patterns: List[Tuple] = None
+) -> List[str]:
+    '''
+    Constructs the candidate rules for single rule configuration, i.e., `params`
+    and `calls` are single integers instead of lists. The `pname` parameter
+    denotes the name of the predicate, e.g., `entry` for rules to be used as
+    entry predicate. The optional `patterns` restrict the heads of entry rules,
+    see function `buildHeads`.
+
+    The input `params=1, fields=["next"], arguemts=1, calls=0,
+    pname="entry"` yields the following output:
+
+    ['entry(This) :- node(This), next(This, null), true.', 'entry(This) :-
+        node(This), next(This, This), true.', 'entry(This) :- node(This),
+        next(This, Next), true.']
+    '''
+    rules = buildHeads(params, pname, patterns)
+
     # synth connector between rule head and body
     rules = [f"{r}{constants.DELIMITER_RULE}" for r in rules]
 
@@ -154,3 +333,107 @@ def buildRules(
     rules = [f"{r}, true." for r in rules]
 
     return rules
+
+
+def countRules(
+        params: int,
+        fields: List[str],
+        arguments: int,
+        calls: int,
+        pname: str,
+        patterns: List[Tuple] = None
+) -> int:
+    '''
+    Counts the candidate rules constructed by `buildRules` for the same input
+    without synthesizing the rules themselves. Only the rule heads are built
+    explicitly. Afterwards, the number of bound variables is tracked: a field
+    clause either keeps the number of bound variables, i.e., `null` or a bound
+    variable, or introduces a fresh variable, and each argument of a recursive
+    call is either `null` or a bound variable.
+
+    The input `params=1, fields=["next"], arguments=1, calls=1, pname="p"`
+    yields `7`.
+    '''
+    # maps the number of bound variables to the number of partial rules
+    bound2count = {}
+    for head in buildHeads(params, pname, patterns):
+        bound = len(helper.boundVars(head))
+        bound2count[bound] = bound2count.get(bound, 0) + 1
+
+    for field in fields:
+        # mimic `helper.boundVars`, which ignores single letter variables
+        fresh = 1 if len(field) > 1 else 0
+        bound2count_ = {}
+        for bound, count in bound2count.items():
+            bound2count_[bound] = bound2count_.get(bound, 0) + count * (1 + bound)
+            bound2count_[bound + fresh] = bound2count_.get(bound + fresh, 0) + count
+        bound2count = bound2count_
+
+    return sum(
+        count * (1 + bound) ** (arguments * calls)
+        for bound, count in bound2count.items()
+    )
+
+
+def countCandidatesByCalls(complexity) -> Dict[Tuple[str, int], int]:
+    '''
+    Counts the candidate rules composed by `generateRules` for a rule
+    configuration using function `countRules`, grouped by the name of the
+    predicate and the number of recursive calls of the rules.
+    '''
+    counts = {}
+    for entry_calls in complexity['entry_calls']:
+        counts[(constants.PNAME_ENTRY, entry_calls)] = countRules(
+            params=complexity['entry_arity'],
+            fields=complexity['fields'],
+            arguments=complexity['p_arity'],
+            calls=entry_calls,
+            pname=constants.PNAME_ENTRY,
+            patterns=complexity['entry_patterns']
+        )
+    for p_calls in complexity['p_calls']:
+        counts[(constants.PNAME_OTHER, p_calls)] = countRules(
+            params=complexity['p_arity'],
+            fields=complexity['fields'],
+            arguments=complexity['p_arity'],
+            calls=p_calls,
+            pname=constants.PNAME_OTHER
+        )
+    return counts
+
+
+def countCandidates(complexity) -> int:
+    '''
+    Counts the candidate rules composed by `generateRules` for a rule
+    configuration using function `countRules`.
+    '''
+    return sum(countCandidatesByCalls(complexity).values())
+
+
+def cost(complexity, rules: List[str] = None) -> int:
+    '''
+    Predicts the cost of searching a complexity level. The MI applies a
+    candidate rule to a node and proves each recursive call of the rule by
+    applying a candidate `p` rule to the node passed, backtracking over the
+    alternatives. Hence, a rule with `c` recursive calls is weighted with `P **
+    c`, where `P` is the number of candidate `p` rules, and the cost of a level
+    is the sum of the weights of its candidate rules. In contrast to the
+    number of candidate rules, the cost grows exponentially with the number of
+    recursive calls.
+
+    The candidate rules are counted using function `countCandidatesByCalls`,
+    unless the candidate rules, e.g., after pruning, are provided.
+    '''
+    if rules is None:
+        counts = countCandidatesByCalls(complexity)
+    else:
+        counts = {}
+        for rule in rules:
+            head, tail = rule.split(constants.DELIMITER_RULE)
+            key = (head[:head.index('(')], tail.count(' p('))
+            counts[key] = counts.get(key, 0) + 1
+    p_rules = sum(
+        count for (pname, _), count in counts.items()
+        if pname == constants.PNAME_OTHER
+    )
+    return sum(count * p_rules ** calls for (_, calls), count in counts.items())
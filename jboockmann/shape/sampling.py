@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Provides means to learn shape predicates for huge memory graphs from bounded
+size sub-graphs, i.e., samples. A sample is rooted at the entry points of a
+memory graph, or at a sampled node with a synthesized entry pointer, and
+comprises the nodes within a breadth-first traversal of bounded size. Fields
+pointing outside of the sample are set to `NULL`. Hence, a shape predicate
+learned from samples does not necessarily match the memory graph and is to be
+confirmed, see `learn.learn`.
+"""
+
+import copy
+from typing import Dict, Iterator, List
+
+from . import constants
+from .helper import logger
+from .model import MemoryGraph
+
+
+def samples(
+        memory_graphs: List[MemoryGraph],
+        size: int = None
+) -> Iterator[List[MemoryGraph]]:
+    """
+    Yields samples of the memory graphs with a doubling number of nodes,
+    starting at `size` nodes, as long as a memory graph is larger than the
+    samples, see function `sample`. Nothing is yielded unless a memory graph
+    has more than `constants.SAMPLING_THRESHOLD` nodes. Memory graphs that are
+    not larger than the samples are used as they are.
+
+    :param memory_graphs: A non-empty list of homogeneously typed memory graphs.
+    :param size: The initial number of nodes of a sample, which defaults to `constants.SAMPLING_SIZE`.
+    :return: An iterator over lists of samples.
+    """
+    if size is None:
+        size = constants.SAMPLING_SIZE
+    largest = max(len(g.vertexIds()) for g in memory_graphs)
+    if constants.SAMPLING_THRESHOLD is None \
+            or largest <= constants.SAMPLING_THRESHOLD:
+        return
+    # samples are rooted at synthesized entry points only if this does not
+    # change the number of entry points
+    synthesize = all(len(g.entrypoints()) == 1 for g in memory_graphs)
+    while size < largest:
+        samples_ = []
+        for memory_graph in memory_graphs:
+            if len(memory_graph.vertexIds()) <= size:
+                samples_.append(memory_graph)
+            else:
+                samples_.extend(sample(memory_graph, size, synthesize))
+        logger().debug(f'learning from {len(samples_)} samples of {size} nodes')
+        yield samples_
+        size *= 2
+
+
+def rounds(
+        memory_graphs: List[MemoryGraph],
+        size: int = None
+) -> int:
+    """
+    Returns the number of lists of samples yielded by function `samples`
+    without drawing the samples.
+
+    :param memory_graphs: A non-empty list of homogeneously typed memory graphs.
+    :param size: The initial number of nodes of a sample, which defaults to `constants.SAMPLING_SIZE`.
+    :return: The number of lists of samples.
+    """
+    if size is None:
+        size = constants.SAMPLING_SIZE
+    largest = max(len(g.vertexIds()) for g in memory_graphs)
+    if constants.SAMPLING_THRESHOLD is None \
+            or largest <= constants.SAMPLING_THRESHOLD:
+        return 0
+    count = 0
+    while size < largest:
+        count += 1
+        size *= 2
+    return count
+
+
+def sample(
+        memory_graph: MemoryGraph,
+        size: int,
+        synthesize: bool = True
+) -> List[MemoryGraph]:
+    """
+    Draws samples of at most `size` nodes from a memory graph. The first sample
+    is rooted at the entry points of the memory graph. If `synthesize` is set
+    and the memory graph has a single entry pointer, further samples are drawn
+    until the vertex abstraction of each non entry node of the memory graph is
+    covered, but at most `constants.SAMPLING_MAX_SAMPLES` samples. A vertex
+    abstraction is covered by a non root node of a sample whose fields all
+    point inside of the sample. Each further sample is rooted at a predecessor
+    of the first node with an uncovered abstraction, or at the node itself if
+    it has no predecessor, which is the target of a synthesized entry pointer
+    of the same name as the original one.
+
+    :param memory_graph: A memory graph.
+    :param size: The maximal number of nodes of a sample.
+    :param synthesize: Whether samples may be rooted at synthesized entry points.
+    :return: The list of samples.
+    """
+    entrypoints = memory_graph.entrypoints()
+    nodes = breadthFirstNodes(
+        memory_graph, [ep['target'] for ep in entrypoints], size)
+    samples_ = [subgraph(memory_graph, nodes, entrypoints)]
+    if not synthesize or len(entrypoints) != 1:
+        return samples_
+
+    # the vertex abstraction of each non entry node
+    cached = memory_graph.vertexAbstractions()
+    ids = memory_graph.vertexIds()
+    id2abstraction = {
+        id: abstraction
+        for id, abstraction, entry in zip(
+            ids, cached['inverse'].tolist(), cached['entry'].tolist())
+        if not entry
+    }
+    covered = coveredAbstractions(memory_graph, nodes, id2abstraction)
+
+    predecessors = {}
+    for id in ids:
+        for rnode in memory_graph.successors(id):
+            predecessors.setdefault(rnode, id)
+
+    for id in id2abstraction:
+        if len(samples_) >= constants.SAMPLING_MAX_SAMPLES:
+            break
+        if id2abstraction[id] in covered:
+            continue
+        root = predecessors.get(id, id)
+        nodes = breadthFirstNodes(memory_graph, [root], size)
+        samples_.append(subgraph(memory_graph, nodes, [
+            dict(entrypoints[0], target=root)
+        ]))
+        covered |= coveredAbstractions(memory_graph, nodes, id2abstraction)
+        # do not sample the same abstraction again, even if the sample was
+        # too small to cover it
+        covered.add(id2abstraction[id])
+    return samples_
+
+
+def breadthFirstNodes(
+        memory_graph: MemoryGraph,
+        roots: List[str],
+        size: int
+) -> List[str]:
+    """
+    Returns the roots and the first nodes reached in a breadth-first traversal
+    starting at the roots, such that at most `size` nodes are returned unless
+    there are more roots.
+    """
+    nodes = list(dict.fromkeys(roots))
+    visited = set(nodes)
+    pos = 0
+    while pos < len(nodes) and len(nodes) < size:
+        for rnode in memory_graph.successors(nodes[pos]):
+            if rnode not in visited and len(nodes) < size:
+                visited.add(rnode)
+                nodes.append(rnode)
+        pos += 1
+    return nodes
+
+
+def coveredAbstractions(
+        memory_graph: MemoryGraph,
+        nodes: List[str],
+        id2abstraction: Dict[str, int]
+) -> set:
+    """
+    Returns the vertex abstractions of the non root nodes of a sample, see
+    function `breadthFirstNodes`, whose fields all point inside of the sample,
+    i.e., whose vertex abstraction is the same as in the memory graph. Only
+    the nodes in `id2abstraction`, i.e., the non entry nodes of the memory
+    graph, are considered.
+    """
+    sampled = set(nodes)
+    return {
+        id2abstraction[id] for id in nodes[1:]
+        if id in id2abstraction
+        and all(rnode in sampled for rnode in memory_graph.successors(id))
+    }
+
+
+def subgraph(
+        memory_graph: MemoryGraph,
+        nodes: List[str],
+        entrypoints: List[Dict[str, str]]
+) -> MemoryGraph:
+    """
+    Returns the sub-graph of a memory graph comprising the given nodes and
+    entry points, where fields pointing outside of the sub-graph are set to
+    `NULL`.
+    """
+    sampled = set(nodes)
+    vertices = []
+    for id in nodes:
+        vertex = copy.deepcopy(memory_graph.vertex(id))
+        for assignment in vertex['assignment']:
+            if assignment['value'] not in sampled:
+                assignment['value'] = constants.NULL_UPPER
+        vertices.append(vertex)
+    return MemoryGraph.fromJSON({
+        'structs': copy.deepcopy(memory_graph.structs()),
+        'vertices': vertices,
+        'entrypoints': copy.deepcopy(entrypoints)
+    })
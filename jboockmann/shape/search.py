@@ -6,19 +6,52 @@ Provides access to the meta-interpretive search.
 import copy
 import re
 import subprocess
-from typing import List, Tuple, Any
+from typing import Any, Dict, List, Tuple
 
 from . import pruning
 from . import constants
 from . import helper
 from .model import MemoryGraph
-from .helper import ShaPEexception, logger
+from .helper import ShaPEexception, ShaPEtimeout, logger
 
 
 def search(
         rules: List[str],
         memory_graphs: List[MemoryGraph],
+        required: List[List[str]] = None,
+        model: Dict = None,
+        frequencies: Dict = None,
+        timeout: float = None
 ) -> List[str]:
+    """
+    Searches for a subset of the candidate rules that forms a shape predicate
+    matching the memory graphs.
+
+    The optional parameter `required` constrains the search to rules subsets
+    that contain at least one rule from each of the provided lists of rules.
+    This is used by `learn.learn` to rule out solutions that have already been
+    searched for at a lower complexity level.
+
+    The optional parameters `model` and `frequencies` denote a rule ordering
+    model, see `pruning.trainOrderingModel`, and the vertex abstraction
+    frequencies of the memory graphs, see `pruning.abstractionFrequencies`,
+    that determine the order in which the MI tries the candidate rules.
+
+    :param rules: The candidate rules.
+    :param memory_graphs: A non-empty list of memory graphs.
+    :param required: A list of rule lists, each of which must contribute at least one rule to the solution.
+    :param model: An optional rule ordering model.
+    :param frequencies: Optional vertex abstraction frequencies.
+    :param timeout: The timeout of the MI in seconds, which defaults to `constants.TIMEOUT_PROLOG`.
+    :return: The found shape predicate.
+    :raises ShaPEexception: If the MI could not find a matching rules subset.
+    """
+    # rule IDs are assigned along the order of the candidate rules
+    rule2id = {rule: str(pos) for pos, rule in enumerate(rules)}
+    required_ids = [
+        [rule2id[r] for r in required_rules]
+        for required_rules in (required or [])
+    ]
 
     # rules pre-processing
     rules = inject_conditions(rules)
@@ -33,8 +66,13 @@ def search(
         id2condition[rule_id] = condition_id
         id2rule[rule_id] = rule
 
-    rules = pruning.optimizeOrderOfRules(rules)
-    out, _ = conduct(assemble_prolog_program(rules, memory_graphs))
+    rules = pruning.optimizeOrderOfRules(
+        rules, model=model, frequencies=frequencies
+    )
+    out, _ = conduct(
+        assemble_prolog_program(rules, memory_graphs, required=required_ids),
+        timeout=timeout
+    )
 
     # the MI returns a list of rule IDs, e.g., `[1,2,3,4,5]`
     rule_ids = out[1:-1].split(',')
@@ -58,7 +96,8 @@ def search(
 def assemble_prolog_program(
         rules: List[str],
         memory_graphs: List[MemoryGraph],
-        mi_path: str = constants.MI_INFER
+        mi_path: str = constants.MI_INFER,
+        required: List[List[str]] = None
 ) -> str:
     """
     Assembles a Prolog program from the following four chunks of information:
@@ -72,6 +111,10 @@ def assemble_prolog_program(
     path to the meta-interpreter, the second chunk is derived from parameter
     `memoryGraph`, and the third chunk is derived from parameter `rules`. The
     query, i.e., the fourth chunk, is constructed from the memory graph as well.
+
+    The optional parameter `required` contains lists of rule IDs. For each list,
+    the query demands that at least one of its rules is part of the found rules
+    subset. Otherwise, the query backtracks into the MI.
     """
     program = []
 
@@ -119,12 +162,16 @@ def assemble_prolog_program(
     queries = []
     p = 0
     for p, memoryGraph in enumerate(memory_graphs):
-        node_ids = [v['id'] for v in memoryGraph.json['vertices']]
+        node_ids = memoryGraph.vertexIds()
         node_ids = ", ".join(node_ids)
         ep_nodes = [ep["target"] for ep in memoryGraph.entrypoints()]
         ep_nodes = ", ".join(ep_nodes)
         query = f'mi_seplog(entry({ep_nodes}), [{node_ids}], [], ROut{p}, ROut{p + 1}, COut{p}, COut{p + 1})'
         queries.append(query)
+    for r, rule_ids in enumerate(required or []):
+        queries.append(
+            f'once((member(R{r}, ROut{p + 1}), memberchk(R{r}, [{", ".join(rule_ids)}])))'
+        )
     queries_string = ",\n\t".join(queries)
     go_query = f'go() :- ROut0 = [], COut0 = [],{queries_string},print(ROut{p + 1}).'
     program.append(go_query)
@@ -157,7 +204,7 @@ def conduct(
         out = out.decode('utf-8')
         err = err.decode('utf-8')
     except subprocess.TimeoutExpired:
-        raise ShaPEexception(f'swipl caused a timeout after {timeout} sec')
+        raise ShaPEtimeout(f'swipl caused a timeout after {timeout} sec')
 
     if p.returncode != 0:
         # Something is rotten in the implementation of the MI ...
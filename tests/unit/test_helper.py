@@ -4,7 +4,7 @@ Test cases for the `helper.py` module.
 '''
 
 from jboockmann.shape import (
-    helper
+    constants, helper
 )
 from jboockmann.shape.helper import ShaPEexception
 from jboockmann.shape.model import MemoryGraph
@@ -25,6 +25,13 @@ def test_boundVars():
         "p(This, Par1)  :-  node(This), next(This, Next), p(")
 
 
+def test_entryPattern():
+    assert helper.entryPattern(['n1', 'null', 'n2', 'n1']) == \
+        (0, constants.NULL_LOWER, 1, 0)
+    assert helper.entryPattern(['This', 'NULL', 'Par2', 'This']) == \
+        (0, constants.NULL_LOWER, 1, 0)
+
+
 def test_getModuleFolder():
     import os
     expected = os.path.realpath(FOLDER_PACKAGE)
@@ -149,3 +156,23 @@ def test_extractFieldNames():
     actual = helper.extractFieldNames(rules)
 
     assert expected == actual
+
+
+def test_pointstograph_to_JSON():
+    import json
+    with open(f'{EXAMPLES_DSI}/sll_4.dot') as f:
+        actual = json.loads(helper.pointstograph_to_JSON(f.read()))
+    assert actual['entrypoints'] == [
+        {'name': 'ep', 'target': 'n5', 'type': 'list'}
+    ]
+    assert actual['structs'] == [
+        {'fields': [{'name': 'next', 'type': 'node'}], 'name': 'node'},
+        {'fields': [{'name': 'head', 'type': 'node'}], 'name': 'list'}
+    ]
+    successors = {
+        v['id']: [a['value'] for a in v['assignment']]
+        for v in actual['vertices']
+    }
+    assert successors['n5'] == ['n11']
+    assert successors['n11'] == ['n17']
+    assert successors['n23'] == ['NULL']
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+'''
+Test cases for the `rules.py` module.
+'''
+
+from jboockmann.shape import rules, constants
+from jboockmann.shape.model import MemoryGraph
+
+from ..settings import EXAMPLES_PROLOG
+
+
+def test_buildHeads():
+    expected = ['p(This, null)', 'p(This, This)', 'p(This, Par1)']
+    actual = rules.buildHeads(2, constants.PNAME_OTHER)
+    assert expected == actual
+
+
+def test_buildHeadsPatterns():
+    expected = ['entry(Par0, This)', 'entry(This, Par1)']
+    actual = rules.buildHeads(2, constants.PNAME_ENTRY, [(0, 1)])
+    assert expected == actual
+
+    expected = ['entry(This, null)', 'entry(null, This)']
+    actual = rules.buildHeads(
+        2, constants.PNAME_ENTRY, [(0, constants.NULL_LOWER), (constants.NULL_LOWER, 0)]
+    )
+    assert sorted(expected) == sorted(actual)
+
+    for head in rules.buildHeads(2, constants.PNAME_ENTRY, [(0, 1)]):
+        assert head in rules.buildHeads(2, constants.PNAME_ENTRY)
+
+
+def test_entryPatterns():
+    memory_graph = MemoryGraph.fromFile(f'{EXAMPLES_PROLOG}/lseg.pl')
+    assert rules.entryPatterns([memory_graph]) == [(0, 1)]
+
+
+def test_countRules():
+    for fields in (['next'], ['left', 'right']):
+        for params in (1, 2):
+            for calls in (0, 1, 2):
+                for pname in (constants.PNAME_ENTRY, constants.PNAME_OTHER):
+                    expected = len(rules.buildRules(
+                        params, fields, params, calls, pname
+                    ))
+                    actual = rules.countRules(
+                        params, fields, params, calls, pname
+                    )
+                    assert expected == actual
+
+    patterns = [(0, 1), (0, 0)]
+    for calls in (0, 1):
+        expected = len(rules.buildRules(
+            2, ['next'], 1, calls, constants.PNAME_ENTRY, patterns
+        ))
+        actual = rules.countRules(
+            2, ['next'], 1, calls, constants.PNAME_ENTRY, patterns
+        )
+        assert expected == actual
+
+
+def test_countCandidates():
+    for complexity in rules.generator(['left', 'right'], 1):
+        if complexity['p_arity'] > 1:
+            break
+        rules_ = rules.generateRules(complexity)
+        assert len(rules_) == rules.countCandidates(complexity)
+        assert rules.cost(complexity, rules_) == rules.cost(complexity)
+
+
+def test_complexityBounds():
+    memory_graph = MemoryGraph.fromFile(f'{EXAMPLES_PROLOG}/bt-parent.pl')
+    expected = {'p_vars': 2, 'entry_vars': 2}
+    actual = rules.complexityBounds([memory_graph])
+    assert expected == actual
+
+
+def test_generatorBounds():
+    memory_graph = MemoryGraph.fromFile(f'{EXAMPLES_PROLOG}/bt-parent.pl')
+    fields = memory_graph.fields()
+    unbounded = list(rules.generator(fields, 1))
+    bounded = list(rules.generator(fields, 1, [memory_graph]))
+    assert len(bounded) < len(unbounded)
+    for complexity in bounded:
+        assert complexity['entry_patterns'] == [(0,)]
+        complexity['entry_patterns'] = None
+        assert complexity in unbounded
+
+
+def test_schedule():
+    memory_graph = MemoryGraph.fromFile(f'{EXAMPLES_PROLOG}/bt-parent.pl')
+    fields = memory_graph.fields()
+    complexities = list(rules.generator(fields, 1, [memory_graph]))
+    scheduled = rules.schedule(complexities, [memory_graph])
+    assert all(c in complexities for c in scheduled)
+    assert all(c['entry_calls'] and c['p_calls'] for c in scheduled)
+
+    def rank(c):
+        return c['p_arity'] + len(c['p_calls']) + len(c['entry_calls'])
+    ranks = [rank(c) for c in scheduled]
+    assert ranks == sorted(ranks)
+    # levels of different arities are interleaved by their rank
+    arities = [c['p_arity'] for c in scheduled]
+    assert arities != sorted(arities)
+    for c1, c2 in zip(scheduled, scheduled[1:]):
+        if rank(c1) == rank(c2) and rules.likelihood(c1, [memory_graph]) == \
+                rules.likelihood(c2, [memory_graph]):
+            assert rules.cost(c1) <= rules.cost(c2)
+    assert any(c['p_arity'] == constants.LIMIT_PARAMS for c in scheduled)
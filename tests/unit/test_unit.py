@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 
+import copy
+import multiprocessing
 from glob import glob
+from typing import Callable
+
+import pytest
 
 from jboockmann.shape import (
-    pruning, search, rules,
-    composition, learn, match,
+    pruning, search, rules, compression, sampling,
+    composition, estimate, learn, match,
     verifast, constants, helper
 )
 from jboockmann.shape.helper import ShaPEexception
-from jboockmann.shape.model import MemoryGraph
+from jboockmann.shape.model import MemoryGraph, CompactMemoryGraph
 
 FOLDER_EXAMPLES = 'examples-prolog'
 FOLDER_DSI = 'examples-dsi'
@@ -24,11 +29,402 @@ def test_fromPLFile():
         MemoryGraph.fromPLFile(file_)
 
 
+def test_fromPLFileStreaming(tmp_path):
+    filename = tmp_path / 'memory-graph.pl'
+    filename.write_text(
+        '% a singly-linked list\n'
+        'node(n1). node(n2).\n'
+        'node(n3).  % the last node\n'
+        '\n'
+        'next(n1,\n'
+        '     n2).\n'
+        'next(n2, n3). next(n3, null).\n'
+        'entrypoint(\n'
+        '    n1\n'
+        ').\n'
+    )
+
+    def vertex(id, value):
+        return {
+            'id': id,
+            'assignment': [{'name': 'next', 'value': value, 'type': 'struct0'}],
+            'struct': 'struct0'
+        }
+    assert MemoryGraph.fromPLFile(str(filename)).json == {
+        'structs': [
+            {'name': 'struct0', 'fields': [{'type': 'struct0', 'name': 'next'}]}
+        ],
+        'vertices': [
+            vertex('n1', 'n2'), vertex('n2', 'n3'), vertex('n3', 'NULL')
+        ],
+        'entrypoints': [{'name': 'ep0', 'target': 'n1', 'type': 'struct0'}]
+    }
+
+    filename.write_text('node(n1).\nnext(n1, null)\n')
+    with pytest.raises(ShaPEexception, match='at the end'):
+        MemoryGraph.fromPLFile(str(filename))
+
+    # a malformed fact is reported with its line before the rest is read
+    filename.write_text('node(n1).\nnext(n1 n2).\n' + 'node(n2).\n' * 1000)
+    with pytest.raises(ShaPEexception, match='line 2 '):
+        MemoryGraph.fromPLFile(str(filename))
+    filename.write_text('node(n1).\nnode(n2) next(n1, n2).\n')
+    with pytest.raises(ShaPEexception, match='line 2 '):
+        MemoryGraph.fromPLFile(str(filename))
+
+
 def test_constructDot():
     for file_ in glob(f'{FOLDER_EXAMPLES}/*.json'):
         MemoryGraph.fromJSONFile(file_).constructDot()
 
 
+def test_memoryGraphIndex():
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/cdll.pl')
+    ep = memory_graph.entrypoint()['target']
+    nodes = memory_graph.reachableNodes(ep)
+    assert nodes[0] == ep
+    assert sorted(nodes) == sorted(v['id'] for v in memory_graph.vertices())
+    assert memory_graph.vertex(ep)['id'] == ep
+
+    # patching the vertices updates the index
+    memory_graph.json['vertices'] = [memory_graph.vertex(ep)]
+    assert memory_graph.reachableNodes(ep, fields=[]) == [ep]
+    assert [v['id'] for v in memory_graph.vertices()] == [ep]
+
+
+def test_compactMemoryGraph():
+    def key(abstractions):
+        return sorted(tuple(sorted(a.items())) for a in abstractions)
+
+    for file_ in ['sll-null.pl', 'cdll.pl', 'bt-parent.pl']:
+        memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/{file_}')
+        compact = memory_graph.compact()
+        assert compact.toMemoryGraph().json == memory_graph.json
+        assert compact.fields() == memory_graph.fields()
+        assert compact.synthPrologFacts() == memory_graph.synthPrologFacts()
+        fields = memory_graph.fields()[:1]
+        for vertex in memory_graph.vertices():
+            assert set(compact.reachableNodes(vertex['id'])) == \
+                set(memory_graph.reachableNodes(vertex['id']))
+            assert compact.reachableNodes(vertex['id'], fields) == \
+                memory_graph.reachableNodes(vertex['id'], fields)
+            assert compact.successors(vertex['id'], fields) == \
+                memory_graph.successors(vertex['id'], fields)
+            assert compact.structOfVertex(vertex['id'].capitalize()) == \
+                memory_graph.structOfVertex(vertex['id'].capitalize())
+        assert compact.vertices() is compact.vertices()
+        assert key(compact.vertexAbstractionOthers()) == \
+            key(memory_graph.vertexAbstractionOthers())
+        assert key(compact.vertexAbstractionOthers(deduplicate=False)) == \
+            key(memory_graph.vertexAbstractionOthers(deduplicate=False))
+        assert compact.vertexAbstractionEP() == memory_graph.vertexAbstractionEP()
+
+    memory_graph = MemoryGraph.fromDOTFile(f'{FOLDER_DSI}/sll_4.dot')
+    compact = CompactMemoryGraph.fromJSON(memory_graph.json)
+    compact.detect_entrypointers()
+    assert compact.entrypoints() == memory_graph.entrypoints()
+
+
+def test_vertexAbstractionsCache():
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/sll-null.pl')
+    assert memory_graph.vertexAbstractions() is memory_graph.vertexAbstractions()
+    assert sorted(memory_graph.vertexAbstractionCounts(), key=str) == [
+        ({'next': 'Var0'}, len(memory_graph.vertices()) - 2),
+        ({'next': 'null'}, 1)
+    ]
+
+    # patching the vertices updates the abstractions
+    ep = memory_graph.entrypoint()['target']
+    last = [v for v in memory_graph.vertices()
+            if v['assignment'][0]['value'] == 'NULL'][0]
+    memory_graph.json['vertices'] = [memory_graph.vertex(ep), last]
+    assert memory_graph.vertexAbstractionCounts() == [({'next': 'null'}, 1)]
+
+
+def test_canonicalHash():
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/bt-parent.pl')
+    renamed = copy.deepcopy(memory_graph.json)
+    for vertex in renamed['vertices']:
+        vertex['id'] = f'x{vertex["id"]}'
+        vertex['assignment'].reverse()
+        for assignment in vertex['assignment']:
+            if assignment['value'] != 'NULL':
+                assignment['value'] = f'x{assignment["value"]}'
+    for ep in renamed['entrypoints']:
+        ep['target'] = f'x{ep["target"]}'
+    renamed['vertices'].reverse()
+    renamed = MemoryGraph.fromJSON(renamed)
+    assert renamed.canonicalHash() == memory_graph.canonicalHash()
+
+    # the entry pointer is respected
+    renamed.json['entrypoints'] = [
+        dict(renamed.entrypoint(), target=renamed.vertices()[0]['id'])
+    ]
+    assert renamed.canonicalHash() != memory_graph.canonicalHash()
+
+    # rotating the entry pointer of a cyclic list yields an isomorphic graph
+    cdll = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/cdll.pl')
+    rotated = MemoryGraph.fromJSON(copy.deepcopy(cdll.json))
+    rotated.json['entrypoints'][0]['target'] = rotated.successors(
+        cdll.entrypoint()['target'])[0]
+    rotated.invalidateIndex()
+    assert rotated.canonicalHash() == cdll.canonicalHash()
+    assert cdll.canonicalHash() != memory_graph.canonicalHash()
+
+    assert helper.unique_memory_graphs(
+        [memory_graph, cdll, renamed, rotated, memory_graph]
+    ) == [memory_graph, cdll, renamed]
+
+    # structs are respected by their fields rather than by their names
+    restructed = copy.deepcopy(memory_graph.json)
+    for struct in restructed['structs']:
+        struct['name'] = f'x{struct["name"]}'
+    for vertex in restructed['vertices']:
+        vertex['struct'] = f'x{vertex["struct"]}'
+    restructed = MemoryGraph.fromJSON(restructed)
+    assert restructed.canonicalHash() == memory_graph.canonicalHash()
+
+    # targets without a vertex are distinguished from each other
+    def dangling(left, right):
+        return MemoryGraph.fromJSON({
+            'structs': [],
+            'entrypoints': [],
+            'vertices': [{'id': 'n1', 'struct': 's', 'assignment': [
+                {'name': 'left', 'value': left},
+                {'name': 'right', 'value': right}
+            ]}]
+        }).canonicalHash()
+    assert dangling('a', 'a') == dangling('b', 'b')
+    assert dangling('a', 'b') == dangling('b', 'a')
+    assert dangling('a', 'a') != dangling('a', 'b')
+
+
+def linkedList(length: int, **fields: Callable[[int], int]) -> MemoryGraph:
+    # a list of nodes `n0`, `n1`, ... linked by field `next`, further fields
+    # map the position of a node to the position of its target or `None`
+    fields = dict(next=lambda i: i + 1, **fields)
+
+    def target(pos):
+        return f'n{pos}' if pos is not None and 0 <= pos < length else 'NULL'
+
+    return MemoryGraph.fromJSON({
+        'structs': [{'name': 'struct0', 'fields': [
+            {'name': name, 'type': 'struct0'} for name in fields
+        ]}],
+        'vertices': [
+            {
+                'id': f'n{i}',
+                'struct': 'struct0',
+                'assignment': [
+                    {'name': name, 'value': target(field(i))}
+                    for name, field in fields.items()
+                ]
+            }
+            for i in range(length)
+        ],
+        'entrypoints': [{'name': 'ep0', 'target': 'n0', 'type': 'struct0'}]
+    })
+
+
+def test_compress():
+    memory_graph = linkedList(20, prev=lambda i: i - 1)
+    vertices = copy.deepcopy(memory_graph.vertices())
+    compressed = compression.compress(memory_graph, length=3)
+    # the entry node, three inner nodes and the last node are kept
+    assert [v['id'] for v in compressed.vertices()] == \
+        ['n0', 'n1', 'n2', 'n3', 'n19']
+    assert compressed.successors('n3') == ['n19', 'n2']
+    assert compressed.successors('n19') == ['n3']
+    assert compression.abstractions(compressed) == \
+        compression.abstractions(memory_graph)
+    assert memory_graph.vertices() == vertices
+
+    # the cycle of a lasso is shortened, but not closed elsewhere
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/lasso.pl')
+    compressed = compression.compress(memory_graph, length=3)
+    assert compressed.reachableNodes('n1') == \
+        ['n1', 'n2', 'n3', 'n4', 'n5', 'n6', 'n7']
+    assert compressed.successors('n7') == ['n4']
+
+    # short chains are kept
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/sll-null.pl')
+    assert compression.compress(memory_graph) is memory_graph
+
+
+def test_learnComplexitiesDelta(monkeypatch):
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/sll-null.pl')
+
+    def level(p_arity, p_calls, entry_calls):
+        return {
+            'fields': memory_graph.fields(), 'p_arity': p_arity,
+            'entry_arity': 1, 'p_calls': list(range(p_calls)),
+            'entry_calls': list(range(entry_calls)), 'entry_patterns': None
+        }
+    levels = [level(1, 2, 2), level(2, 2, 2), level(2, 1, 2), level(2, 3, 2)]
+    candidates = [
+        pruning.pruneRules(rules.generateRules(c), [memory_graph])
+        for c in levels
+    ]
+    monkeypatch.setattr(
+        rules, 'schedule', lambda complexities, memory_graphs: levels)
+
+    searched = []
+
+    def search_(rules_, memory_graphs, required=None, **kwargs):
+        searched.append((rules_, required))
+        if len(searched) < 3:
+            raise ShaPEexception('no shape predicate')
+        return ['predicate']
+    monkeypatch.setattr(search, 'search', search_)
+
+    assert learn.learn_complexities([memory_graph]) == ['predicate']
+    # the third level is covered by the second one and is skipped
+    assert set(candidates[2]) <= set(candidates[1])
+    assert [rules_ for rules_, _ in searched] == \
+        [candidates[0], candidates[1], candidates[3]]
+    # the first level shares no rule with the others
+    assert [required for _, required in searched] == [[], [], [
+        [r for r in candidates[3] if r not in candidates[1]]
+    ]]
+
+
+def test_learnCompressionThreshold(monkeypatch):
+    length = 20
+    memory_graph = linkedList(length)
+    searched = []
+
+    def search_(rules_, memory_graphs, **kwargs):
+        searched.append([len(g.vertexIds()) for g in memory_graphs])
+        return ['predicate']
+    monkeypatch.setattr(search, 'search', search_)
+
+    # small memory graphs are learned as they are
+    statistics = []
+    assert learn.learn([memory_graph], statistics=statistics) == ['predicate']
+    assert searched == [[length]]
+    assert [level['attempt'] for level in statistics] == ['full']
+
+    # the predicate learned for the compressed memory graph is confirmed
+    monkeypatch.setattr(constants, 'COMPRESSION_THRESHOLD', length - 1)
+    searched.clear()
+    statistics.clear()
+    assert learn.learn([memory_graph], statistics=statistics) == ['predicate']
+    assert searched == [[5], [length]]
+    assert [level['attempt'] for level in statistics] == ['compressed']
+
+
+def test_learnAttemptsTimeout(monkeypatch):
+    memory_graph = linkedList(20)
+    timeouts = []
+
+    def search_(rules_, memory_graphs, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        return ['predicate']
+    monkeypatch.setattr(search, 'search', search_)
+    monkeypatch.setattr(constants, 'COMPRESSION_THRESHOLD', 10)
+
+    # the confirmation is bounded by the overall timeout of the attempts
+    monkeypatch.setattr(constants, 'TIMEOUT_LEARN_ATTEMPTS', 60)
+    statistics = []
+    learn.learn([memory_graph], statistics=statistics)
+    assert [level['attempt'] for level in statistics] == ['compressed']
+    assert len(timeouts) == 2 and 0 < timeouts[1] <= 60
+
+    # no attempt is started once the overall timeout has passed
+    monkeypatch.setattr(constants, 'TIMEOUT_LEARN_ATTEMPTS', 0)
+    statistics.clear()
+    timeouts.clear()
+    learn.learn([memory_graph], statistics=statistics)
+    assert [level['attempt'] for level in statistics] == ['full']
+    assert timeouts == [None]
+
+
+def test_sample(monkeypatch):
+    memory_graph = linkedList(2000, other=lambda i: i if i == 1500 else None)
+    samples = sampling.sample(memory_graph, 100)
+    assert [len(s.vertices()) for s in samples] == [100, 100, 2]
+    assert [s.entrypoint()['target'] for s in samples] == \
+        ['n0', 'n1499', 'n1998']
+    # the sampled list is cut off at the boundary of the sample
+    assert samples[0].successors('n99') == []
+    covered = set()
+    for sample in samples:
+        covered.update(str(a) for a in sample.vertexAbstractionOthers())
+    assert covered >= {
+        str(a) for a in memory_graph.vertexAbstractionOthers()
+    }
+
+    assert list(sampling.samples([memory_graph])) == []
+    assert sampling.rounds([memory_graph]) == 0
+    monkeypatch.setattr(constants, 'SAMPLING_THRESHOLD', 1000)
+    assert [
+        max(len(s.vertices()) for s in samples)
+        for samples in sampling.samples([memory_graph], size=500)
+    ] == [500, 1000]
+    assert sampling.rounds([memory_graph], size=500) == 2
+
+
+def test_stronglyConnectedComponents():
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/cdll.pl')
+    components = memory_graph.stronglyConnectedComponents()
+    assert len(components) == 1
+    assert sorted(components[0]) == sorted(
+        v['id'] for v in memory_graph.vertices())
+
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/sll-null.pl')
+    components = memory_graph.stronglyConnectedComponents()
+    assert all(len(component) == 1 for component in components)
+    # successors are listed before their predecessors
+    ep = memory_graph.entrypoint()['target']
+    assert components[-1] == [ep]
+
+    memory_graph.json['entrypoints'] = []
+    memory_graph.detect_entrypointers()
+    assert [ep['target'] for ep in memory_graph.entrypoints()] == [ep]
+
+    compact = memory_graph.compact()
+    assert compact.stronglyConnectedComponents() == components
+    compact.detect_entrypointers()
+    assert compact.entrypoints() == memory_graph.entrypoints()
+
+
+def test_binaryMemoryGraph(tmp_path):
+    for file_ in [f'{FOLDER_EXAMPLES}/bt-parent.pl', f'{FOLDER_DSI}/sll_4.dot']:
+        memory_graph = MemoryGraph.fromFile(file_)
+        filename = str(tmp_path / 'memory-graph.mgb')
+        memory_graph.compact().toBinaryFile(filename)
+        binary = MemoryGraph.fromFile(filename)
+        assert isinstance(binary, CompactMemoryGraph)
+        assert binary.json == memory_graph.json
+        ep = memory_graph.entrypoints()[0]['target']
+        assert binary.reachableNodes(ep) == memory_graph.reachableNodes(ep)
+
+    with open(filename, 'wb') as f:
+        f.write(bytes(64))
+    with pytest.raises(ShaPEexception):
+        CompactMemoryGraph.fromBinaryFile(filename)
+
+
+def test_binaryMemoryGraphPatching(tmp_path):
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/sll-null.pl')
+    filename = str(tmp_path / 'memory-graph.mgb')
+    memory_graph.compact().toBinaryFile(filename)
+    ep = memory_graph.entrypoint()['target']
+    rnode = memory_graph.successors(ep)[0]
+
+    binary = CompactMemoryGraph.fromBinaryFile(filename)
+    with pytest.raises(TypeError):
+        binary.json['vertices'] = []
+    assert copy.deepcopy(binary.json) == memory_graph.json
+
+    expected = composition.extract_subgraph(memory_graph, rnode)
+    patched = composition.extract_subgraph(
+        MemoryGraph.fromFile(filename).toMemoryGraph(), rnode)
+    assert patched.json == expected.json
+    assert [ep['target'] for ep in patched.entrypoints()] == [rnode]
+    assert memory_graph.toMemoryGraph() is memory_graph
+
+
 def test_onlyDiffersInCallOrder():
     rule1 = 'p(This) :- node(This), left(This, This), right(This, Right), p(Right), true.'
     rule2 = 'p(This) :- node(This), left(This, Left), right(This, This), p(Left), true.'
@@ -45,6 +441,286 @@ def test_onlyDiffersInCallOrder():
     assert pruning.onlyDiffersInCallOrder(rule2, rule1)
 
 
+def test_pruneByVertexAbstraction():
+    assert pruning.encodeAssignment(
+        {'left': 'Left', 'right': 'null', 'parent': 'Left'},
+        ['left', 'right', 'parent']
+    ) == [0, -1, 0]
+
+    rules_ = [
+        'p(This) :- node(This), left(This, Left), right(This, null), true.',
+        'p(This) :- node(This), left(This, null), right(This, Right), true.',
+        'p(This) :- node(This), left(This, Left), right(This, Left), true.',
+        'p(This) :- node(This), left(This, Left), right(This, Right), true.',
+        'p(This) :- node(This), left(This, This), right(This, null), true.',
+    ]
+    abstractions = [
+        {'left': 'Var0', 'right': 'null'},
+        {'left': 'Var0', 'right': 'Var0'},
+    ]
+    assert pruning.pruneByVertexAbstraction(rules_, abstractions) == [
+        rules_[0], rules_[2]
+    ]
+    assert pruning.pruneByVertexAbstraction(rules_, []) == []
+
+
+def test_isCanonicalEntryRule():
+    rule1 = 'entry(This) :- node(This), next(This, Next), p(Next, This, null), true.'
+    rule2 = 'entry(This) :- node(This), next(This, Next), p(Next, null, This), true.'
+    assert pruning.isCanonicalEntryRule(rule1)
+    assert not pruning.isCanonicalEntryRule(rule2)
+
+    rule1 = 'entry(This) :- node(This), left(This, Left), right(This, Right), p(Left, This, null), p(Right, null, This), true.'
+    rule2 = 'entry(This) :- node(This), left(This, Left), right(This, Right), p(Left, null, This), p(Right, This, null), true.'
+    assert pruning.isCanonicalEntryRule(rule1) != pruning.isCanonicalEntryRule(rule2)
+
+    rules_ = rules.buildRules(1, ['next'], 3, 1, constants.PNAME_ENTRY)
+    pruned = pruning.pruneParameterPermutations(rules_)
+    assert len(pruned) < len(rules_)
+    assert all(pruning.isCanonicalEntryRule(r) for r in pruned)
+
+    # only entry rules are dropped, the rules of p are kept in every order of
+    # their parameters and dominate the candidate rules of an arity 3 level
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/sll-null.pl')
+    complexity = {
+        'fields': memory_graph.fields(), 'p_arity': 3, 'entry_arity': 1,
+        'p_calls': [0, 1], 'entry_calls': [0, 1], 'entry_patterns': None
+    }
+    rules_ = pruning.pruneRules(rules.generateRules(complexity), [memory_graph])
+    pruned = pruning.pruneParameterPermutations(rules_)
+    entryRules = [r for r in rules_ if r.startswith('entry(')]
+    assert [r for r in pruned if not r.startswith('entry(')] == \
+        [r for r in rules_ if not r.startswith('entry(')]
+    assert len(rules_) - len(pruned) == len([
+        r for r in entryRules if not pruning.isCanonicalEntryRule(r)
+    ])
+
+
+def test_pruneCommutativeCalls():
+    rule1 = 'p(This) :- node(This), left(This, Left), right(This, Right), p(Right), p(Left), true.'
+    rule2 = 'p(This) :- node(This), left(This, Left), right(This, Right), p(Left), true.'
+    rule3 = 'p(This) :- node(This), left(This, Left), right(This, Right), p(Left), p(Right), true.'
+    assert pruning.pruneCommutativeCalls([rule1, rule2, rule3]) == [rule2, rule3]
+
+
+def test_optimizeOrderOfRules():
+    rule1 = 'entry(This) :- node(This), next(This, Next), p(Next, null), true.'
+    rule2 = 'p(This, Par1) :- node(This), next(This, null), true.'
+    rule3 = 'p(This, null) :- node(This), next(This, Next), p(Next, This), true.'
+    rule4 = 'p(This, null) :- node(This), next(This, Next), p(Next, null), true.'
+    rules_ = [rule4, rule3, rule2, rule1]
+    assert pruning.optimizeOrderOfRules(rules_) == [rule1, rule2, rule3, rule4]
+    assert pruning.multiHeuristicsKey(rule1, constants.COMPARATORS_DEFAULT) < \
+        pruning.multiHeuristicsKey(rule2, constants.COMPARATORS_DEFAULT)
+    assert pruning.optimizeOrderOfRules(
+        rules_, [(pruning.comparator_pname, -1)]
+    ) == [rule4, rule3, rule2, rule1]
+
+
+def test_trainOrderingModel():
+    predicate = helper.parseRulesTemplate(f'{constants.FOLDER_TEMPLATES}/bt-parent.pl')
+    model = pruning.trainOrderingModel([predicate])
+    assert model['rules'] == {'entry': 1, 'p': 4}
+    assert model['counts']['p']['comparator_nullFields'] == {'2': 1, '1': 2, '0': 1}
+
+    rule1 = 'p(This, P1) :- node(This), left(This, null), right(This, Right), parent(This, P1), p(Right, This), true.'
+    rule2 = 'p(This, P1) :- node(This), left(This, null), right(This, null), parent(This, null), true.'
+    assert pruning.comparator_model(rule1, model) < pruning.comparator_model(rule2, model)
+    assert pruning.optimizeOrderOfRules([rule2, rule1], model=model) == [rule1, rule2]
+
+    assert pruning.validateOrderingModel(model) is model
+    for features in (['comparator_unknown'], ['__import__']):
+        with pytest.raises(ShaPEexception):
+            pruning.validateOrderingModel(dict(model, features=features))
+        with pytest.raises(ShaPEexception):
+            pruning.trainOrderingModel([predicate], features)
+
+
+def test_abstractionFrequencies():
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/bt-null.pl')
+    abstractions = memory_graph.vertexAbstractionOthers(deduplicate=False)
+    frequencies = pruning.abstractionFrequencies([memory_graph])
+    assert sum(frequencies['p'].values()) == len(abstractions)
+    assert len(frequencies['p']) == len(memory_graph.vertexAbstractionOthers())
+
+    leaf = 'p(This) :- node(This), left(This, null), right(This, null), true.'
+    inner = 'p(This) :- node(This), left(This, Left), right(This, Right), p(Left), p(Right), true.'
+    assert pruning.comparator_frequency(leaf, frequencies) == \
+        -frequencies['p'][(-1, -1)]
+    assert pruning.optimizeOrderOfRules(
+        [inner, leaf], frequencies=frequencies
+    )[0] == max(
+        [inner, leaf], key=lambda r: -pruning.comparator_frequency(r, frequencies)
+    )
+
+
+def test_pruneRulesSharded(monkeypatch):
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/bt-null.pl')
+    complexity = next(
+        c for c in rules.generator(memory_graph.fields(), 1, [memory_graph])
+        if len(c['p_calls']) == 2 and len(c['entry_calls']) == 3
+    )
+    rules_ = rules.generateRules(complexity)
+    expected = pruning.pruneRules(rules_, [memory_graph], processes=1)
+
+    monkeypatch.setattr(constants, 'PRUNING_SHARD_SIZE', 20)
+    monkeypatch.setattr(constants, 'PRUNING_PARALLEL_THRESHOLD', 20)
+    assert expected == pruning.pruneRules(rules_, [memory_graph], processes=1)
+    assert expected == pruning.pruneRules(rules_, [memory_graph], processes=2)
+
+    # a pool is only started if each process prunes enough rules
+    def pool(*args, **kwargs):
+        raise AssertionError('unexpected process pool')
+    monkeypatch.setattr(multiprocessing, 'Pool', pool)
+    monkeypatch.setattr(constants, 'PRUNING_PARALLEL_THRESHOLD', len(rules_))
+    assert expected == pruning.pruneRules(rules_, [memory_graph], processes=2)
+
+
+def test_pruningStatistics(monkeypatch):
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/bt-null.pl')
+    complexity = next(
+        c for c in rules.generator(memory_graph.fields(), 1, [memory_graph])
+        if len(c['p_calls']) == 2 and len(c['entry_calls']) == 3
+    )
+    rules_ = rules.generateRules(complexity)
+    monkeypatch.setattr(constants, 'PRUNING_SHARD_SIZE', 20)
+    monkeypatch.setattr(constants, 'PRUNING_PARALLEL_THRESHOLD', 20)
+
+    for processes in (1, 2):
+        statistics = pruning.PruningStatistics()
+        pruned = pruning.pruneRules(
+            rules_, [memory_graph], processes=processes, statistics=statistics
+        )
+        passes = statistics.asList()
+        assert [p['name'] for p in passes][:7] == [
+            'entry abstraction', 'p abstraction', 'entry pointer fields',
+            'calls to This', 'calls to null', 'identical calls',
+            'singleton rules'
+        ]
+        assert passes[0]['rules_in'] + passes[1]['rules_in'] == len(rules_)
+        assert passes[-1]['rules_out'] == len(pruned)
+        assert all(0.0 <= p['ratio'] <= 1.0 for p in passes)
+
+
+def test_estimatePruneLimit(monkeypatch):
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/sll-null.pl')
+    nodes = len(memory_graph.vertexIds())
+    monkeypatch.setattr(constants, 'PRUNING_SHARD_SIZE', 20)
+    monkeypatch.setattr(constants, 'ESTIMATE_PRUNE_SHARDS', 2)
+    levels = estimate.estimate([memory_graph])
+    assert {level['attempt'] for level in levels} == {'full'}
+    assert any(not level['exact'] for level in levels)
+
+    # the exact levels count the rules searched by learn
+    failed = []
+    complexities = rules.schedule(
+        rules.generator(memory_graph.fields(), 1, [memory_graph]), [memory_graph]
+    )
+    for level, complexity in zip(levels, complexities):
+        assert level['exact'] == (level['candidates'] <= 40)
+        if not level['exact']:
+            assert level['pruned'] is None
+            assert level['cost'] == rules.cost(complexity) * nodes
+            continue
+        searched = learn.level_rules(complexity, [memory_graph], failed)
+        assert level['skipped'] == (searched is None)
+        if searched is not None:
+            failed.append(searched[2])
+            assert level['pruned'] == len(searched[0])
+            assert level['cost'] == rules.cost(complexity, searched[0]) * nodes
+
+    levels = estimate.estimate([memory_graph], prune=False)
+    assert not any(level['exact'] or level['skipped'] for level in levels)
+
+
+def test_estimateAttempts(monkeypatch):
+    monkeypatch.setattr(constants, 'COMPRESSION_THRESHOLD', None)
+    monkeypatch.setattr(constants, 'SAMPLING_THRESHOLD', 10)
+    monkeypatch.setattr(constants, 'SAMPLING_SIZE', 5)
+    monkeypatch.setattr(constants, 'SAMPLING_MAX_SAMPLES', 1)
+    memory_graph = linkedList(40)
+    levels = estimate.estimate([memory_graph, memory_graph])
+    attempts, count = learn.preliminary_attempts([memory_graph])
+    expected = [attempt for attempt, _ in attempts] + ['full']
+    assert expected == ['samples 1', 'samples 2', 'samples 3', 'full']
+    assert count == 3
+    assert list(dict.fromkeys(level['attempt'] for level in levels)) == expected
+
+
+def test_pruneRulesShardMultipleGraphs():
+    memory_graphs = [
+        MemoryGraph.fromPLFile(file_)
+        for file_ in sorted(glob(f'{FOLDER_EXAMPLES}/series-bt/*.pl'))
+    ]
+    complexity = next(
+        c for c in rules.generator(memory_graphs[0].fields(), 1, memory_graphs)
+        if len(c['entry_calls']) == 3
+    )
+    rules_ = [r for r in rules.generateRules(complexity) if r.startswith('entry(')]
+    expected = set()
+    for memory_graph in memory_graphs:
+        expected.update(pruning.pruneRulesShard(rules_, [memory_graph]))
+    actual = pruning.pruneRulesShard(rules_, memory_graphs)
+    assert len(actual) < len(rules_)
+    assert set(actual) == expected
+
+
+def test_pruneByEntryPointerFields(tmp_path):
+    # the second entry pointer points into the next field of the first one
+    filename = tmp_path / 'memory-graph.pl'
+    filename.write_text(
+        'node(n1). node(n2). node(n3).\n'
+        'next(n1, n2). next(n2, n3). next(n3, null).\n'
+        'entrypoint(n1). entrypoint(n2).\n'
+    )
+    memory_graph = MemoryGraph.fromPLFile(str(filename))
+    # the pattern does not tell both entry pointers from unrelated ones
+    assert rules.entryPatterns([memory_graph]) == [(0, 1)]
+
+    related = 'entry(This, Par1) :- node(This), next(This, Par1), p(Par1), true.'
+    fresh = 'entry(This, Par1) :- node(This), next(This, Next), p(Par1), p(Next), true.'
+    reversed_ = 'entry(Par0, This) :- node(This), next(This, Par0), p(Par0), true.'
+    second = 'entry(Par0, This) :- node(This), next(This, Next), p(Par0), p(Next), true.'
+    assert pruning.pruneByEntryPointerFields(
+        [related, fresh, reversed_, second], [memory_graph]
+    ) == [related, second]
+
+    complexity = next(
+        c for c in rules.generator(memory_graph.fields(), 2, [memory_graph])
+        if len(c['entry_calls']) == 3
+    )
+    pruned = pruning.pruneRules(rules.generateRules(complexity), [memory_graph])
+    entryRules = [r for r in pruned if r.startswith('entry(This')]
+    assert entryRules
+    assert all('next(This, Par1)' in r for r in entryRules)
+
+
+def test_pruneByCallAnalysis():
+    for file_ in glob(f'{constants.FOLDER_TEMPLATES}/*.pl'):
+        predicate = helper.parseRulesTemplate(file_)
+        assert pruning.pruneByCallAnalysis(predicate) == predicate
+
+    entry = 'entry(This) :- node(This), next(This, Next), p(Next, This), true.'
+    leaf = 'p(This, Par1) :- node(This), next(This, null), true.'
+    unreachable = 'p(This, null) :- node(This), next(This, null), true.'
+    consumed = 'p(This, Par1) :- node(This), next(This, null), p(Par1, This), true.'
+    unproductive = 'p(This, Par1) :- node(This), next(This, Next), p(Next, This), true.'
+
+    assert pruning.pruneUnreachableRules([entry, leaf, unreachable]) == [entry, leaf]
+    assert pruning.pruneConsumedParameterCalls([entry, leaf, consumed]) == [entry, leaf]
+    assert pruning.pruneUnproductiveRules([entry, unproductive]) == []
+    statistics = pruning.PruningStatistics()
+    assert pruning.pruneByCallAnalysis(
+        [entry, leaf, unreachable, consumed, unproductive], statistics
+    ) == [entry, leaf, unproductive]
+    passes = statistics.asList()
+    assert [p['name'] for p in passes] == [
+        'unreachable rules', 'consumed parameter calls', 'unproductive rules'
+    ]
+    assert passes[0]['rules_in'] == 5
+    assert sum(p['rules_in'] - p['rules_out'] for p in passes) == 2
+
+
 def test_areDeterministicRules():
     rules = [
         'entry(This) :- node(This), left(This, Left), right(This, null), p(Left), true.',
@@ -73,3 +749,15 @@ def test_injectCall():
     vin = 'entry(This) :- node(This), next(This, Next), p(Next), true.'
     vout = 'entry(This) :- node(This), next(This, Next), child(This, Child), p(Next), entry1(Child), true.'
     assert composition.inject_call(vin, 'child', 'entry1') == vout
+
+
+def test_assemblePrologProgramRequired():
+    memory_graph = MemoryGraph.fromPLFile(f'{FOLDER_EXAMPLES}/sll-null.pl')
+    rules = ['entry(This) :- condition(0, 0), node(This), next(This, null), true.']
+    program = search.assemble_prolog_program(
+        rules, [memory_graph], required=[['0'], ['1', '2']]
+    )
+    assert 'once((member(R0, ROut1), memberchk(R0, [0])))' in program
+    assert 'once((member(R1, ROut1), memberchk(R1, [1, 2])))' in program
+    program = search.assemble_prolog_program(rules, [memory_graph])
+    assert 'memberchk' not in program